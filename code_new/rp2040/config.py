@@ -6,89 +6,109 @@ It serves as a single source of truth for hardware pin definitions, system const
 state definitions.
 
 Usage:
-    from config import pins, constants, states
+    from config import VCR_PLAY, MM_PER_OZ
+    from config import states
     
-    # Access pin definitions
-    play_pin = pins.VCR_PLAY
+    # Access pin definitions and system constants directly
+    play_pin = VCR_PLAY
+    mm_per_oz = MM_PER_OZ
     
-    # Access system constants
-    mm_per_oz = constants.MM_PER_OZ
-    
-    # Access state definitions
+    # Access state definitions; states are ints, states.NAMES gives their names
     current_state = states.READY
+    print(states.NAMES[current_state])
 
-The configuration is separated into logical sections (pins, constants, states) to make
-it easy to locate and modify settings. All values should be treated as read-only.
+Pin definitions and system constants are plain module-level names, so each access is a
+single global lookup instead of a lookup through a class dictionary. Integer values are
+declared with const() so references inside this module fold to immediate operands. There
+are no class namespaces re-exporting them: inside this module a const() name is replaced
+by its value wherever it appears, so an alias such as `VCR_PLAY = VCR_PLAY` would compile
+to `15 = 15` and fail. The states and commands classes only hold values under different
+names. The module is listed in manifest.py so it can be frozen into the firmware, keeping its
+bytecode and strings in flash rather than RAM. All values should be treated as read-only.
 
 This module should be imported by all other modules that need access to configuration values.
 No other module should define these constants.
 """
 
-class pins:
-    # VCR control pins
-    VCR_PLAY = 15
-    VCR_EJECT = 14
-    
-    # GRBL control pins
-    GRBL_EN = 28  # Input pin to detect GRBL controller status
-    UART_TX = 12  # UART TX pin for GRBL communication
-    UART_RX = 13  # UART RX pin for GRBL communication
-    
-    # Pump control pins (stepper enable pins)
-    PUMP_PINS = [
-        6,   # Pump 0
-        7,   # Pump 1
-        9,   # Pump 2
-        18,  # Pump 3
-        19,  # Pump 4
-        20,  # Pump 5
-        21,  # Pump 6
-        22,  # Pump 7
-        26,  # Pump 8
-        27   # Pump 9
-    ]
-    
-    # Cup presence detection pin
-    CUP_PRESENCE = 10
-    
-    # Raspberry Pi serial communication
-    PI_UART_TX = 0  # UART1 TX pin for Pi communication
-    PI_UART_RX = 1  # UART1 RX pin for Pi communication
-
-class constants:
-    # GRBL settings
-    GRBL_BAUDRATE = 115200
-    GRBL_PUMP_RATE = 2000  # F2000 feedrate for pump movement
-    GRBL_TIMEOUT_MS = 1000  # Timeout for GRBL response in milliseconds
-    
-    # Pump settings
-    MM_PER_OZ = 100  # 100mm of movement per fluid ounce
-    NUM_PUMPS = len(pins.PUMP_PINS)
-    MAX_PUMP_OZ = 10.0  # Maximum fluid per pump operation
-    MIN_PUMP_OZ = 0.1   # Minimum fluid per pump operation
-    
-    # VCR button control
-    BUTTON_PRESS_MS = 200  # Duration to hold button in milliseconds
-    
-    # Serial communication with Raspberry Pi
-    PI_BAUDRATE = 115200
-    COMMAND_TIMEOUT_MS = 5000  # Timeout for command execution
-    
-    # Maintenance settings
-    PRIME_AMOUNT_MM = 200  # Amount to move for priming pumps
-    CLEAN_AMOUNT_MM = 150  # Amount to move for cleaning pumps
-    
-    # System settings
-    EVENT_LOOP_DELAY_MS = 10  # Main loop delay in milliseconds
+from array import array
+from micropython import const
+
+# VCR control pins
+VCR_PLAY = const(15)
+VCR_EJECT = const(14)
+
+# GRBL control pins
+GRBL_EN = const(28)  # Input pin to detect GRBL controller status
+UART_TX = const(12)  # UART TX pin for GRBL communication
+UART_RX = const(13)  # UART RX pin for GRBL communication
+
+# Pump control pins (stepper enable pins), packed as unsigned bytes
+PUMP_PINS = array('B', (
+    6,   # Pump 0
+    7,   # Pump 1
+    9,   # Pump 2
+    18,  # Pump 3
+    19,  # Pump 4
+    20,  # Pump 5
+    21,  # Pump 6
+    22,  # Pump 7
+    26,  # Pump 8
+    27   # Pump 9
+))
+PUMP_MASK = const(0x0C7C02C0)  # One bit per pump enable GPIO; keep in sync with PUMP_PINS
+
+# Cup presence detection pin
+CUP_PRESENCE = const(10)
+
+# Raspberry Pi serial communication
+PI_UART_TX = const(0)  # UART1 TX pin for Pi communication
+PI_UART_RX = const(1)  # UART1 RX pin for Pi communication
+PI_UART_RTS = const(11)  # UART1 RTS pin; the Pi pauses sending while it is high
+
+# GRBL settings
+GRBL_BAUDRATE = const(115200)
+GRBL_PUMP_RATE = const(2000)  # F2000 feedrate for pump movement
+GRBL_TIMEOUT_MS = const(1000)  # Timeout for GRBL response in milliseconds
+
+# Pump settings
+MM_PER_OZ = const(100)  # 100mm of movement per fluid ounce
+OZ_SCALE = const(100)  # Amounts are converted to hundredths of an ounce for integer math
+NUM_PUMPS = const(10)  # Must match len(PUMP_PINS)
+MAX_PUMP_OZ = 10.0  # Maximum fluid per pump operation
+MIN_PUMP_OZ = 0.1   # Minimum fluid per pump operation
+
+# VCR button control
+BUTTON_PRESS_MS = const(200)  # Duration to hold button in milliseconds
+
+# Serial communication with Raspberry Pi
+PI_BAUDRATE = const(921600)  # The Pi side must match, with CTS flow control enabled
+PI_RXBUF = const(512)  # UART receive buffer, so bursts at this rate do not stall the parser
+COMMAND_TIMEOUT_MS = const(5000)  # Timeout for command execution
+
+# Maintenance settings
+PRIME_AMOUNT_MM = const(200)  # Amount to move for priming pumps
+CLEAN_AMOUNT_MM = const(150)  # Amount to move for cleaning pumps
+
+# System states, as small integers so state checks and table lookups compare ints
+STATE_READY = const(0)
+STATE_RECIPE_LOADED = const(1)
+STATE_POURING = const(2)
+STATE_MAINTENANCE = const(3)
+STATE_ERROR = const(4)
+STATE_INITIALIZING = const(5)
+STATE_NAMES = ("READY", "RECIPE_LOADED", "POURING", "MAINTENANCE", "ERROR", "INITIALIZING")  # Indexed by state, for logging
 
 class states:
     # System states
-    INITIALIZING = "INITIALIZING"
-    READY = "READY"
-    RECIPE_LOADED = "RECIPE_LOADED"
-    POURING = "POURING"
-    MAINTENANCE = "MAINTENANCE"
-    ERROR = "ERROR"
+    INITIALIZING = STATE_INITIALIZING
+    READY = STATE_READY
+    RECIPE_LOADED = STATE_RECIPE_LOADED
+    POURING = STATE_POURING
+    MAINTENANCE = STATE_MAINTENANCE
+    ERROR = STATE_ERROR
+    
+    # State names, indexed by state
+    NAMES = STATE_NAMES
 
 class commands:
     # Serial command types
@@ -32,32 +32,98 @@ before full system testing to verify hardware connections.
 """
 
 import time
+import rp2
 from machine import Pin
-from config import pins, constants
+from config import PUMP_PINS, PUMP_MASK, VCR_PLAY, VCR_EJECT, GRBL_EN, UART_TX, UART_RX, PI_UART_TX, PI_UART_RX
+from sio import gpio_set, gpio_clr
+
+# PIO cycles per enable/disable phase of the pump toggle program
+PUMP_TOGGLE_PHASE_CYCLES = 2048
+
+@rp2.asm_pio(set_init=rp2.PIO.OUT_HIGH)
+def _pump_toggle():
+    # Three enable (LOW) / disable (HIGH) cycles, then idle with the pin HIGH.
+    # Each phase is 32 iterations of 64 cycles = PUMP_TOGGLE_PHASE_CYCLES.
+    set(x, 2)
+    label("cycle")
+    set(pins, 0)
+    set(y, 31)
+    label("low")
+    nop()           [31]
+    nop()           [30]
+    jmp(y_dec, "low")
+    set(pins, 1)
+    set(y, 31)
+    label("high")
+    nop()           [31]
+    nop()           [30]
+    jmp(y_dec, "high")
+    jmp(x_dec, "cycle")
+    label("done")
+    jmp("done")
 
 class GPIOTester:
     """Provides testing functionality for GPIO pins."""
     
     def __init__(self):
-        """Initialize the GPIO tester with pin setup."""
+        """
+        Initialize the GPIO tester.
+        
+        No hardware is touched here; each pin group is configured on first use
+        so a test only pays for the pins it actually needs.
+        """
         # Test durations
         self.toggle_duration_ms = 1000  # 1 second per state for measurement
         self.vcr_test_duration_ms = 2000  # 2 seconds for VCR button press
         
-        # Initialize pump pins
-        self.pump_pins = []
-        for pin_num in pins.PUMP_PINS:
-            self.pump_pins.append(Pin(pin_num, Pin.OUT, value=1))  # Start disabled (high)
-        
-        # Initialize VCR pins
-        self.play_pin = Pin(pins.VCR_PLAY, Pin.OUT, value=0)  # Start inactive
-        self.eject_pin = Pin(pins.VCR_EJECT, Pin.OUT, value=0)  # Start inactive
+        # GPIO numbers and combined bitmask for direct register writes
+        self.pump_gpios = PUMP_PINS
+        self.pump_mask = PUMP_MASK
         
-        # Initialize GRBL_EN pin
-        self.grbl_en = Pin(pins.GRBL_EN, Pin.IN)
+        # Pin objects, created lazily by the _ensure_* methods
+        self.pump_pins = None
+        self.play_pin = None
+        self.eject_pin = None
+        self.grbl_en = None
         
         print("GPIO Tester initialized")
     
+    def _ensure_pumps(self):
+        """Configure the pump pins as outputs (start disabled/high) if not done yet."""
+        if self.pump_pins is None:
+            self.pump_pins = tuple(Pin(pin_num, Pin.OUT, value=1) for pin_num in PUMP_PINS)
+    
+    def _ensure_vcr(self):
+        """Configure the VCR button pins as outputs (start inactive) if not done yet."""
+        if self.play_pin is None:
+            self.play_pin = Pin(VCR_PLAY, Pin.OUT, value=0)
+            self.eject_pin = Pin(VCR_EJECT, Pin.OUT, value=0)
+    
+    def _ensure_grbl(self):
+        """Configure the GRBL_EN pin as an input if not done yet."""
+        if self.grbl_en is None:
+            self.grbl_en = Pin(GRBL_EN, Pin.IN)
+    
+    def reset_pins(self):
+        """Return every pin group that has been configured to its safe state."""
+        if self.pump_pins is not None:
+            self.disable_all()  # Disable all pumps
+        if self.play_pin is not None:
+            self.play_pin.value(0)  # Inactive
+            self.eject_pin.value(0)  # Inactive
+    
+    def enable_pump(self, pump_index):
+        """Enable a pump (drive its pin low) with a single register write."""
+        gpio_clr(1 << self.pump_gpios[pump_index])
+    
+    def disable_pump(self, pump_index):
+        """Disable a pump (drive its pin high) with a single register write."""
+        gpio_set(1 << self.pump_gpios[pump_index])
+    
+    def disable_all(self):
+        """Disable all pumps (drive every pump pin high) with one register write."""
+        gpio_set(self.pump_mask)
+    
     def test_pump_pin(self, pump_index):
         """
         Test a specific pump enable pin.
@@ -65,43 +131,68 @@ class GPIOTester:
         Args:
             pump_index: The index of the pump to test.
         """
-        if pump_index < 0 or pump_index >= len(self.pump_pins):
+        if pump_index < 0 or pump_index >= len(self.pump_gpios):
             print(f"Invalid pump index: {pump_index}")
             return
         
-        print(f"Testing Pump {pump_index} pin (GPIO {pins.PUMP_PINS[pump_index]})")
+        self._ensure_pumps()
+        
+        print(f"Testing Pump {pump_index} pin (GPIO {PUMP_PINS[pump_index]})")
         print("Pin should toggle between HIGH (disabled) and LOW (enabled)")
         print("Measure with multimeter to verify")
         
         # Start with pump disabled
-        self.pump_pins[pump_index].value(1)  # High = disabled
+        self.disable_pump(pump_index)  # High = disabled
         
         # Toggle the pin several times with delay
         for i in range(3):
             print(f"Setting Pump {pump_index} ENABLED (LOW)")
-            self.pump_pins[pump_index].value(0)  # Low = enabled
+            self.enable_pump(pump_index)  # Low = enabled
             time.sleep_ms(self.toggle_duration_ms)
             
             print(f"Setting Pump {pump_index} DISABLED (HIGH)")
-            self.pump_pins[pump_index].value(1)  # High = disabled
+            self.disable_pump(pump_index)  # High = disabled
             time.sleep_ms(self.toggle_duration_ms)
         
         print(f"Pump {pump_index} pin test complete")
     
     def test_all_pump_pins(self):
-        """Test all pump pins sequentially."""
+        """
+        Test all pump pins sequentially.
+        
+        Each pin's enable/disable waveform is generated by a PIO state machine,
+        so Python only starts the program and waits for it to finish. Pins are
+        still tested one at a time so each can be identified with a multimeter.
+        """
         print("Testing all pump pins sequentially")
+        print("Each pin toggles 3 times between LOW (enabled) and HIGH (disabled)")
+        
+        self._ensure_pumps()
+        
+        # The program's phase length is fixed in cycles; scale the PIO clock to it
+        freq = PUMP_TOGGLE_PHASE_CYCLES * 1000 // self.toggle_duration_ms
         
         for i in range(len(self.pump_pins)):
-            self.test_pump_pin(i)
+            print(f"Testing Pump {i} pin (GPIO {self.pump_gpios[i]})")
+            sm = rp2.StateMachine(0, _pump_toggle, freq=freq, set_base=self.pump_pins[i])
+            sm.active(1)
+            time.sleep_ms(6 * self.toggle_duration_ms)
+            sm.active(0)
+            
+            # Hand the pin back from PIO to SIO in the disabled state
+            self.pump_pins[i].init(Pin.OUT, value=1)
+        
+        print("All pump pin tests complete")
     
     def test_vcr_pins(self):
         """Test the VCR control pins (play and eject)."""
         print("Testing VCR control pins")
         print("Measure with multimeter to verify")
         
+        self._ensure_vcr()
+        
         # Test play pin
-        print(f"Testing VCR play pin (GPIO {pins.VCR_PLAY})")
+        print(f"Testing VCR play pin (GPIO {VCR_PLAY})")
         print("Pin should go HIGH for 2 seconds")
         self.play_pin.value(1)
         time.sleep_ms(self.vcr_test_duration_ms)
@@ -109,7 +200,7 @@ class GPIOTester:
         time.sleep_ms(self.toggle_duration_ms)
         
         # Test eject pin
-        print(f"Testing VCR eject pin (GPIO {pins.VCR_EJECT})")
+        print(f"Testing VCR eject pin (GPIO {VCR_EJECT})")
         print("Pin should go HIGH for 2 seconds")
         self.eject_pin.value(1)
         time.sleep_ms(self.vcr_test_duration_ms)
@@ -124,18 +215,20 @@ class GPIOTester:
         Args:
             duration_sec: Duration to monitor in seconds.
         """
-        print(f"Monitoring GRBL_EN pin (GPIO {pins.GRBL_EN}) for {duration_sec} seconds")
+        print(f"Monitoring GRBL_EN pin (GPIO {GRBL_EN}) for {duration_sec} seconds")
         print("Current value should be reported every second")
         print("When GRBL is idle, pin should be HIGH")
         print("When GRBL is moving, pin should be LOW")
         
-        end_time = time.time() + duration_sec
+        self._ensure_grbl()
+        
+        deadline = time.ticks_add(time.ticks_ms(), duration_sec * 1000)
         
-        while time.time() < end_time:
+        while time.ticks_diff(deadline, time.ticks_ms()) > 0:
             value = self.grbl_en.value()
             state = "HIGH (idle)" if value == 1 else "LOW (moving)"
             print(f"GRBL_EN: {state}")
-            time.sleep(1)
+            time.sleep_ms(1000)
         
         print("GRBL_EN monitoring complete")
     
@@ -145,10 +238,10 @@ class GPIOTester:
         This doesn't actually test functionality but provides pin info.
         """
         print("UART Pin Information:")
-        print(f"GRBL UART TX: GPIO {pins.UART_TX}")
-        print(f"GRBL UART RX: GPIO {pins.UART_RX}")
-        print(f"Pi UART TX: GPIO {pins.PI_UART_TX}")
-        print(f"Pi UART RX: GPIO {pins.PI_UART_RX}")
+        print(f"GRBL UART TX: GPIO {UART_TX}")
+        print(f"GRBL UART RX: GPIO {UART_RX}")
+        print(f"Pi UART TX: GPIO {PI_UART_TX}")
+        print(f"Pi UART RX: GPIO {PI_UART_RX}")
         print("Use a logic analyzer or oscilloscope to verify UART signals")
     
     def run_all_tests(self):
@@ -175,7 +268,7 @@ if __name__ == "__main__":
     print("VHS Coffeeman GPIO Test Tool")
     print("---------------------------")
     
-    # Create the tester
+    # Create the tester (pins are configured only by the test that is chosen)
     tester = GPIOTester()
     
     # Ask for test mode
@@ -214,9 +307,6 @@ if __name__ == "__main__":
         print(f"Error: {e}")
     
     finally:
-        # Clean up: make sure all pins are in safe state
-        for pin in tester.pump_pins:
-            pin.value(1)  # Disable all pumps
-        tester.play_pin.value(0)  # Inactive
-        tester.eject_pin.value(0)  # Inactive
+        # Clean up: make sure all configured pins are in safe state
+        tester.reset_pins()
         print("Test complete, pins reset to safe state")
\ No newline at end of file
@@ -7,20 +7,21 @@ the completion of those commands.
 
 Classes:
     GRBLInterface: Manages communication with the GRBL controller
+    GRBLError: Raised when GRBL fails to acknowledge a command in time
 
 The GRBLInterface class is responsible for:
     - Initializing the serial connection to the GRBL controller
     - Sending movement commands to the GRBL controller
     - Resetting the current position to zero
     - Reading and parsing responses from the GRBL controller
-    - Monitoring the GRBL_EN pin to detect when a move is complete
+    - Monitoring the GRBL_EN pin (via a PIO state machine) to detect when a move is complete
 
 Usage:
     from grbl_interface import GRBLInterface
-    from config import pins, constants
     
-    # Initialize the interface
+    # Initialize the interface (no I/O), then bring GRBL to a known position
     grbl = GRBLInterface()
+    grbl.start()
     
     # Reset the current position to zero
     grbl.reset_position()
@@ -28,23 +29,73 @@ Usage:
     # Send a movement command
     grbl.move(distance_mm=100, feed_rate=2000)
     
-    # Wait for the move to complete
+    # Wait for the move to complete (sends any queued commands first)
     grbl.wait_for_completion()
+    
+    # Moves can also be queued and sent together explicitly
+    grbl.move(50)
+    grbl.move(-50)
+    grbl.flush()
 
 The interface uses the pin definitions and constants in config.py for GRBL communication.
-Commands are sent as G-code strings over the serial connection.
-The completion of a move is detected by monitoring the GRBL_EN pin.
+Commands are sent as G-code lines over the serial connection, batched in a transmit
+queue that is flushed once per logical step.
+The completion of a move is detected by a small PIO program that samples GRBL_EN every
+cycle, waits for it to go low and then high again, and pushes a word to its RX FIFO;
+the CPU only checks the FIFO or sleeps until the program's interrupt fires. A move can
+carry a release mask of GPIOs (pump enables) that the interrupt handler drives high the
+moment the move finishes, so a pump stops at interrupt latency rather than when the
+waiting task next runs.
 
-Error handling is included to detect and report any issues with the GRBL controller,
-including timeouts and communication errors.
+Error handling is included to detect and report any issues with the GRBL controller.
+A command that GRBL never acknowledges raises GRBLError, so the caller can stop the
+pumps, soft_reset() GRBL and carry on instead of restarting the whole system.
 
 This module depends on:
     - config.py for pin definitions and GRBL settings
+    - sio.py for the SIO GPIO register helpers
 """
 
 import time
-from machine import Pin, UART
-from config import pins, constants
+import asyncio
+import rp2
+from machine import Pin, UART, idle
+from micropython import const
+from config import UART_TX, UART_RX, GRBL_EN, GRBL_BAUDRATE, GRBL_PUMP_RATE, GRBL_TIMEOUT_MS
+from sio import gpio_in, gpio_set
+
+# Set to 1 and rebuild to enable diagnostic prints; when 0 the compiler drops them
+_DEBUG = const(0)
+
+# PIO state machine for GRBL_EN completion detection (PIO1, SM0; gpio_test uses PIO0)
+_DONE_SM = const(4)
+
+# Size of the transmit queue for batching G-code lines into one UART write
+_TX_BUF_SIZE = const(256)
+
+# Room reserved in the transmit queue for one move command
+_MAX_MOVE_LEN = const(32)
+
+# Interval between UART polls while waiting for GRBL's replies to a soft reset
+_POLL_MS = const(2)
+
+# GRBL has finished restarting after a soft reset once it is quiet this long
+_RESET_QUIET_MS = const(100)
+
+@rp2.asm_pio()
+def _grbl_done():
+    # Wait for GRBL_EN to go low (move running), then high (move finished),
+    # report it through the RX FIFO and the state machine's IRQ, then halt
+    wait(0, pin, 0)
+    wait(1, pin, 0)
+    push(noblock)
+    irq(rel(0))
+    label("halt")
+    jmp("halt")
+
+class GRBLError(Exception):
+    """GRBL did not acknowledge a command within the response timeout."""
+    pass
 
 class GRBLInterface:
     """Interface for communicating with the GRBL controller."""
@@ -52,53 +103,393 @@ class GRBLInterface:
     def __init__(self):
         """Initialize the GRBL interface with UART and pin setup."""
         # Initialize UART for GRBL communication
+        # The driver blocks in readline() until a full line or the timeout,
+        # so no Python-level wait loop is needed; rxbuf holds the responses
+        # to a batch of queued commands until they are read
         self.uart = UART(0, 
-                         baudrate=constants.GRBL_BAUDRATE,
-                         tx=Pin(pins.UART_TX),
-                         rx=Pin(pins.UART_RX))
-        self.uart.init(bits=8, parity=None, stop=1)
+                         baudrate=GRBL_BAUDRATE,
+                         bits=8, parity=None, stop=1,
+                         tx=Pin(UART_TX),
+                         rx=Pin(UART_RX),
+                         rxbuf=256,
+                         timeout=GRBL_TIMEOUT_MS,
+                         timeout_char=5)
         
         # Initialize the GRBL_EN pin for monitoring move completion
-        self.grbl_en = Pin(pins.GRBL_EN, Pin.IN)
+        # The Pin object configures the input; reads go straight to SIO
+        self.grbl_en = Pin(GRBL_EN, Pin.IN)
+        self._en_mask = 1 << GRBL_EN
+        
+        # PIO completion detector, plus a flag its interrupt sets to wake async waiters
+        # and the GPIOs the interrupt drives high when the armed move finishes
+        self._done_flag = asyncio.ThreadSafeFlag()
+        self._release_mask = 0
+        self._sm = rp2.StateMachine(_DONE_SM, _grbl_done, in_base=self.grbl_en)
+        self._sm.irq(self._done_isr, hard=True)
         
         # Command constants
         self.RESET_POSITION = b'G92X0Y0\n'
+        self.RELATIVE_MODE = b'G91\n'
+        self.ABSOLUTE_MODE = b'G90\n'
+        self.MOVE_PREFIX = b'G1X'
+        self.DEFAULT_FEED = b'F%d\n' % GRBL_PUMP_RATE
+        
+        # Transmit queue; commands are batched here until flush()
+        self._tx_buf = bytearray(_TX_BUF_SIZE)
+        self._tx_view = memoryview(self._tx_buf)
+        self._tx_len = 0
+        
+        # Lines queued or sent whose 'ok' or 'error:N' has not been read yet
+        self._acks_due = 0
+        
+        # Set by feed_hold(); GRBL is soft-reset before anything else is queued
+        self._held = False
+    
+    def _en_raw(self):
+        """
+        Read GRBL_EN directly from the SIO GPIO_IN register.
+        
+        Returns:
+            int: Non-zero if GRBL_EN is high (idle), zero if it is low (moving).
+        """
+        return gpio_in() & self._en_mask
+    
+    def _done_isr(self, sm):
+        """
+        Release the armed GPIOs and wake any async waiter when the PIO program
+        reports a finished move. Runs as a hard interrupt, so it does not allocate.
+        
+        Args:
+            sm: The StateMachine that raised the interrupt.
+        """
+        mask = self._release_mask
+        if mask:
+            gpio_set(mask)
+            self._release_mask = 0
+        self._done_flag.set()
+    
+    def _arm(self, release_mask=0):
+        """
+        Restart the PIO completion detector for the next move.
+        
+        Any earlier completion word is discarded, so only a low-then-high sequence
+        on GRBL_EN after this call counts. Call it before the move can start.
+        
+        Args:
+            release_mask: GPIO bit mask to drive high when the move completes.
+        """
+        sm = self._sm
+        sm.active(0)
+        self._release_mask = release_mask
+        while sm.rx_fifo():
+            sm.get()
+        sm.restart()
+        self._done_flag.clear()
+        sm.active(1)
+    
+    def _move_done(self):
+        """
+        Check whether the PIO program has seen the armed move finish.
+        
+        Returns:
+            bool: True once GRBL_EN has gone low and then high since _arm().
+        """
+        return self._sm.rx_fifo() > 0
+    
+    def queue(self, command):
+        """
+        Queue a command for transmission to GRBL.
+        
+        Queued commands are sent together by flush(). If the queue is full, the
+        pending commands are flushed first; a command larger than the whole queue
+        is written immediately. GRBL's answer to the line is read later by
+        read_acks().
+        
+        Args:
+            command: A single command line as bytes, including the trailing newline.
+        """
+        self._acks_due += 1
+        size = len(command)
+        end = self._tx_len + size
+        if end > _TX_BUF_SIZE:
+            self.flush()
+            if size > _TX_BUF_SIZE:
+                self.uart.write(command)
+                return
+            end = size
+        self._tx_buf[self._tx_len:end] = command
+        self._tx_len = end
+    
+    def flush(self):
+        """Send all queued commands to GRBL in a single UART write."""
+        if self._tx_len:
+            self.uart.write(self._tx_view[:self._tx_len])
+            self._tx_len = 0
+    
+    def feed_hold(self):
+        """
+        Stop GRBL motion immediately with a feed hold.
+        
+        The '!' realtime command is written straight to the UART, bypassing the
+        queue, and anything still queued is discarded. Await clear_hold() before
+        queueing the next command, so the held move never resumes; PumpController
+        does this whenever it takes the motion lock.
+        """
+        self._tx_len = 0
+        self.uart.write(b'!')
+        self._held = True
+    
+    async def clear_hold(self):
+        """
+        Soft-reset GRBL if a feed hold is pending.
+        
+        Await this before anything is queued or the completion detector is armed,
+        so the reset cannot discard the next command or be mistaken for its
+        completion. Returns at once when no hold is pending.
+        """
+        if self._held:
+            await self.soft_reset()
+    
+    async def _read_line_async(self, timeout_ms):
+        """
+        Read one line from GRBL without blocking other tasks while waiting.
+        
+        The UART is polled with short sleeps until data arrives; the driver then
+        collects the rest of the line, which follows within a few character times.
+        
+        Args:
+            timeout_ms: How long to wait for the line to start, in milliseconds.
+            
+        Returns:
+            bytes or None: The line, or None if nothing arrived within timeout_ms.
+        """
+        uart = self.uart
+        start = time.ticks_ms()
+        while not uart.any():
+            if time.ticks_diff(time.ticks_ms(), start) >= timeout_ms:
+                return None
+            await asyncio.sleep_ms(_POLL_MS)
+        return uart.readline()
+    
+    async def soft_reset(self):
+        """
+        Soft-reset GRBL, dropping any running move and its buffered commands.
+        
+        Used after a feed hold and to recover from a GRBLError. A reset issued while
+        the axis is still moving leaves GRBL in alarm, so the alarm is cleared with
+        $X; the position is re-zeroed before every move anyway. GRBL's replies are
+        polled with short sleeps in between, so other tasks, such as the serial
+        task handling another STOP, keep running while GRBL restarts.
+        """
+        self._held = False
+        self._tx_len = 0
+        self._acks_due = 0
+        self.uart.write(b'\x18')
+        
+        # Discard the startup banner and alarm messages until GRBL goes quiet;
+        # $X sent before its restart finishes would be dropped with its RX buffer
+        while await self._read_line_async(_RESET_QUIET_MS):
+            pass
+        
+        # Unlock, then wait for the acknowledgement
+        self.uart.write(b'$X\n')
+        while True:
+            response = await self._read_line_async(GRBL_TIMEOUT_MS)
+            if not response or response.startswith(b'ok') or response.startswith(b'error'):
+                break
+    
+    def start(self):
+        """
+        Bring GRBL to a known state once it has booted.
+        
+        Kept out of __init__ so constructing the interface does no blocking I/O;
+        call this after the other subsystems have been set up.
+        
+        Returns:
+            bool: True if GRBL acknowledged the position reset, False otherwise.
+        """
+        try:
+            return self.reset_position()
+        except GRBLError:
+            return False
+    
+    def _emit_int(self, buf, pos, n):
+        """
+        Write an integer as ASCII decimal into a buffer without allocating.
+        
+        Args:
+            buf: The bytearray to write into.
+            pos: The index of the first byte to write.
+            n: The integer to write.
+            
+        Returns:
+            int: The index just past the last byte written.
+        """
+        if n < 0:
+            buf[pos] = 0x2D  # '-'
+            pos += 1
+            n = -n
+        
+        # Count the digits, then fill them in from the right
+        end = pos
+        t = n
+        while True:
+            end += 1
+            t //= 10
+            if not t:
+                break
+        i = end
+        while i > pos:
+            i -= 1
+            buf[i] = 0x30 + n % 10
+            n //= 10
+        return end
+    
+    def relative_mode(self):
+        """
+        Queue a switch to relative positioning (G91).
         
-        # Initialize GRBL
-        self.reset_position()
+        Each move distance is then taken from the current position, so a series
+        of moves needs no position reset between them.
+        """
+        self.queue(self.RELATIVE_MODE)
+    
+    def absolute_mode(self):
+        """Queue a switch back to absolute positioning (G90), GRBL's default."""
+        self.queue(self.ABSOLUTE_MODE)
     
     def reset_position(self):
-        """Reset the current position to zero."""
-        self.uart.write(self.RESET_POSITION)
-        self.read_response()
+        """
+        Reset the current position to zero.
+        
+        The answers to earlier lines (mode switches and moves) that are still
+        unread are read and checked first, so the last one read is the answer to
+        the reset itself.
+        
+        Returns:
+            bool: True if GRBL acknowledged the reset and every earlier line with
+                'ok', False otherwise.
+            
+        Raises:
+            GRBLError: If GRBL does not respond within the timeout.
+        """
+        self.queue(self.RESET_POSITION)
+        return self.read_acks()
     
-    def move(self, distance_mm, feed_rate=None):
+    def read_acks(self):
         """
-        Send a movement command to GRBL.
+        Read GRBL's answer to every line sent since the last call.
+        
+        GRBL answers each line with 'ok' or 'error:N' as soon as it has parsed it,
+        and the answers wait in the UART receive buffer until they are read here.
+        Other lines, such as messages and the startup banner, are skipped. While a
+        feed hold is pending nothing is read, since the soft reset that follows
+        discards the held lines and their answers.
+        
+        Returns:
+            bool: True if every line was acknowledged with 'ok', False if any was
+                rejected with an error or a feed hold is pending.
+            
+        Raises:
+            GRBLError: If an answer does not arrive within the timeout.
+        """
+        if self._held:
+            return False
+        success = True
+        while self._acks_due:
+            response = self.read_response()
+            if response is None:
+                raise GRBLError("No acknowledgement from GRBL")
+            if response == b'ok':
+                self._acks_due -= 1
+            elif response.startswith(b'error'):
+                self._acks_due -= 1
+                success = False
+                if _DEBUG:
+                    print("GRBL rejected a command:", response)
+        return success
+    
+    def move(self, distance_mm, feed_rate=None, release_mask=0):
+        """
+        Queue a movement command for GRBL.
+        
+        The command is sent by the next flush(), which wait_for_completion() and
+        read_response() perform automatically, so consecutive moves queued before
+        a wait go out in one UART write.
         
         Args:
-            distance_mm: Distance to move in millimeters.
+            distance_mm: Distance to move in millimeters. Integers are preferred;
+                floats are sent with three decimal places.
             feed_rate: Feed rate for the move. Defaults to GRBL_PUMP_RATE.
+            release_mask: GPIO bit mask (e.g. a pump enable) to drive high from the
+                completion interrupt as soon as the move finishes.
         
         Returns:
-            bool: True if command was sent successfully, False otherwise.
+            bool: True if command was queued successfully, False otherwise.
         """
-        if feed_rate is None:
-            feed_rate = constants.GRBL_PUMP_RATE
-        
         try:
-            # Compose GRBL command
-            command = f"G1X{distance_mm}F{feed_rate}\n".encode()
-            self.uart.write(command)
+            # Compose the command directly in the transmit queue
+            if self._tx_len + _MAX_MOVE_LEN > _TX_BUF_SIZE:
+                self.flush()
+            buf = self._tx_buf
+            pos = self._tx_len
+            
+            # G1X prefix and distance; integers are emitted digit by digit
+            prefix = self.MOVE_PREFIX
+            buf[pos:pos + len(prefix)] = prefix
+            pos += len(prefix)
+            if isinstance(distance_mm, int):
+                pos = self._emit_int(buf, pos, distance_mm)
+            else:
+                distance = b'%.3f' % distance_mm
+                buf[pos:pos + len(distance)] = distance
+                pos += len(distance)
+            
+            # Feed rate and line terminator
+            if feed_rate is None:
+                feed = self.DEFAULT_FEED
+                buf[pos:pos + len(feed)] = feed
+                pos += len(feed)
+            else:
+                buf[pos] = 0x46  # 'F'
+                pos = self._emit_int(buf, pos + 1, int(feed_rate))
+                buf[pos] = 0x0A  # '\n'
+                pos += 1
+            
+            # Arm the completion detector before GRBL can start moving
+            self._arm(release_mask)
+            self._tx_len = pos
+            self._acks_due += 1
             return True
         except Exception as e:
-            print(f"GRBL move error: {e}")
+            if _DEBUG:
+                print(f"GRBL move error: {e}")
             return False
     
+    def move_raw(self, command):
+        """
+        Queue a pre-encoded movement command for GRBL.
+        
+        Use this for moves that repeat with fixed parameters, so the command
+        bytes are built once instead of on every call.
+        
+        Args:
+            command: A complete G-code move line as bytes, ending in a newline.
+        
+        Returns:
+            bool: True if command was queued successfully.
+        """
+        # Arm the completion detector before GRBL can start moving
+        self._arm()
+        self.queue(command)
+        return True
+    
     def move_backward(self, distance_mm, feed_rate=None):
         """
         Send a backward movement command to GRBL.
         
+        Equivalent to move() with a negative distance, which is preferred.
+        
         Args:
             distance_mm: Distance to move in millimeters (positive value).
             feed_rate: Feed rate for the move. Defaults to GRBL_PUMP_RATE.
@@ -110,36 +501,38 @@ class GRBLInterface:
     
     def read_response(self):
         """
-        Read and parse a response from GRBL.
+        Read a response from GRBL.
+        
+        GRBL responses are plain ASCII ('ok', 'error:N', '<Idle|...>'), so the line
+        is returned as bytes without decoding; compare against bytes literals.
         
         Returns:
-            str or None: The response from GRBL, or None if a timeout occurs.
+            bytes or None: The response from GRBL, or None if a timeout occurs.
         """
-        # Start timeout timer
-        start_time = time.ticks_ms()
-        
-        # Wait for data from GRBL
-        while self.uart.any() == 0:
-            time.sleep_ms(1)
-            
-            # Check for timeout
-            if time.ticks_ms() - start_time > constants.GRBL_TIMEOUT_MS:
-                print("Timeout waiting for GRBL response")
-                return None
+        # Make sure the command being answered has actually been sent
+        self.flush()
         
-        # Read the response
+        # Read the response; the UART timeout bounds the wait
         response = self.uart.readline()
-        if response:
-            response = response.decode('utf-8', 'ignore').strip()
+        if not response:
+            if _DEBUG:
+                print("Timeout waiting for GRBL response")
+            return None
         
-        return response
+        return response.strip()
     
     def wait_for_completion(self, timeout_ms=None):
         """
         Wait for GRBL to complete the current move.
         
-        This method monitors the GRBL_EN pin to detect when a move is complete.
-        The pin is high when GRBL is idle and low when GRBL is executing a move.
+        This method waits on the PIO completion detector. The GRBL_EN pin is high
+        when GRBL is idle and low when GRBL is executing a move, so a finished move
+        shows up as a low-then-high sequence, which the PIO program samples every
+        cycle. The detector is armed by move(), so edges that occur before this
+        method is called are not lost. Between checks the core waits for an
+        interrupt with machine.idle(): the PIO completion interrupt wakes it at
+        once, and the 1 ms system tick bounds the timeout check. Light sleep is
+        not used because it stops the PIO clock.
         
         Args:
             timeout_ms: Timeout in milliseconds. Defaults to 5 times the GRBL timeout.
@@ -148,30 +541,64 @@ class GRBLInterface:
             bool: True if the move completed successfully, False if a timeout occurred.
         """
         if timeout_ms is None:
-            timeout_ms = constants.GRBL_TIMEOUT_MS * 5
+            timeout_ms = GRBL_TIMEOUT_MS * 5
+        
+        # Send any queued moves before waiting on them
+        self.flush()
         
-        start_time = time.ticks_ms()
+        # Bind hot callables to locals for the wait loop
+        ticks = time.ticks_ms
+        diff = time.ticks_diff
+        fifo = self._sm.rx_fifo
         
-        # First, wait for GRBL_EN to go low (indicating move in progress)
-        print("Waiting for GRBL to start movement")
-        while self.grbl_en.value() == 1:
-            time.sleep_ms(10)
+        start_time = ticks()
+        
+        # The PIO program pushes a word once GRBL_EN has gone low and then high
+        if _DEBUG:
+            print("Waiting for GRBL to complete movement")
+        while not fifo():
+            idle()
             
             # Check for timeout
-            if time.ticks_ms() - start_time > timeout_ms:
-                print("Timeout waiting for GRBL to start movement")
+            if diff(ticks(), start_time) > timeout_ms:
+                if _DEBUG:
+                    print("Timeout waiting for GRBL to complete movement")
                 return False
+                
+        return True
+    
+    async def _done_sequence(self):
+        """Wait until the PIO program reports a completed move."""
+        flag = self._done_flag
+        while not self._move_done():
+            await flag.wait()
+    
+    async def wait_for_completion_async(self, timeout_ms=None):
+        """
+        Wait for GRBL to complete the current move without blocking other tasks.
+        
+        Uses the same completion rule as wait_for_completion(), but the PIO
+        program's interrupt wakes this coroutine when the move finishes, so other
+        tasks run while the move is in progress and the wait can be cancelled.
+        
+        Args:
+            timeout_ms: Timeout in milliseconds. Defaults to 5 times the GRBL timeout.
             
-        # Next, wait for GRBL_EN to go high (indicating move complete)
-        print("Waiting for GRBL to complete movement")
-        while self.grbl_en.value() == 0:
-            time.sleep_ms(10)
-            
-            # Check for timeout
-            if time.ticks_ms() - start_time > timeout_ms:
+        Returns:
+            bool: True if the move completed successfully, False if a timeout occurred.
+        """
+        if timeout_ms is None:
+            timeout_ms = GRBL_TIMEOUT_MS * 5
+        
+        # Send any queued moves before waiting on them
+        self.flush()
+        
+        try:
+            await asyncio.wait_for_ms(self._done_sequence(), timeout_ms)
+        except asyncio.TimeoutError:
+            if _DEBUG:
                 print("Timeout waiting for GRBL to complete movement")
-                return False
-                
+            return False
         return True
     
     def is_idle(self):
@@ -181,4 +608,4 @@ class GRBLInterface:
         Returns:
             bool: True if GRBL is idle, False if it's executing a move.
         """
-        return self.grbl_en.value() == 1
\ No newline at end of file
+        return self._en_raw() != 0
\ No newline at end of file
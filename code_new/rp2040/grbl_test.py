@@ -8,30 +8,56 @@ on the VHS Coffeeman system. It allows for testing:
 - Position reset commands
 - GRBL_EN pin monitoring during movements
 - Forward and backward movements
+- Streaming a movement sequence with flow control
 
 Usage:
-    import time
+    import asyncio
     from grbl_test import GRBLTester
     
     # Initialize the tester
     tester = GRBLTester()
     
     # Test basic UART communication
-    tester.test_communication()
+    asyncio.run(tester.test_communication())
     
     # Test a simple movement
-    tester.test_movement(10)  # Move 10mm
+    asyncio.run(tester.test_movement(10))  # Move 10mm
     
     # Test multiple movements
-    tester.test_movement_sequence()
+    asyncio.run(tester.test_movement_sequence())
     
+The tester methods are coroutines: UART traffic goes through asyncio stream
+wrappers, so other tasks keep running while a GRBL round-trip is in flight.
+
 This module is designed for diagnostic purposes to verify that the GRBL
 controller is properly connected and responding to commands.
 """
 
-import time
+import asyncio
 from machine import Pin, UART
-from config import pins, constants
+from micropython import const
+from config import UART_TX, UART_RX, GRBL_EN, GRBL_BAUDRATE, GRBL_PUMP_RATE, GRBL_TIMEOUT_MS
+
+# Set to 1 to trace every command, response and GRBL_EN edge; when 0 the
+# compiler drops those prints so they cannot stall the event loop
+_DEBUG = const(0)
+
+# GRBL_EN is read this long after an edge, so pulses shorter than this are
+# treated as noise. It must stay well below the shortest real level: GRBL holds
+# the steppers enabled for the whole move plus its $1 step idle delay (25 ms by default)
+EN_SETTLE_MS = 5
+
+# Maximum number of encoded move commands kept in the cache
+MOVE_CACHE_SIZE = 16
+
+# Mechanical settle time between moves in the test sequence, in seconds
+SEQUENCE_STEP_SETTLE_S = 0.1
+
+# Max unacknowledged bytes streamed to GRBL (its RX buffer is 128)
+GRBL_STREAM_WINDOW = 120
+
+# Command constants
+_RESET_POSITION = b'G92X0Y0\n'
 
 class GRBLTester:
     """Provides testing functionality for the GRBL interface."""
@@ -39,24 +65,51 @@ class GRBLTester:
     def __init__(self):
         """Initialize the GRBL tester with UART and pin setup."""
         # Initialize UART for GRBL communication
+        # timeout=0 never stalls the event loop waiting for a first byte (the
+        # stream reader only reads once data is ready); timeout_char lets the
+        # driver collect the rest of a line in C instead of byte by byte, and
+        # rxbuf lets the RX interrupt buffer several responses while tasks run
         self.uart = UART(0, 
-                         baudrate=constants.GRBL_BAUDRATE,
-                         tx=Pin(pins.UART_TX),
-                         rx=Pin(pins.UART_RX))
-        self.uart.init(bits=8, parity=None, stop=1)
+                         baudrate=GRBL_BAUDRATE,
+                         bits=8, parity=None, stop=1,
+                         tx=Pin(UART_TX),
+                         rx=Pin(UART_RX),
+                         rxbuf=256,
+                         timeout=0,
+                         timeout_char=5)
+        
+        # Stream wrappers let the event loop run other tasks while the UART is idle
+        self.sreader = asyncio.StreamReader(self.uart)
+        self.swriter = asyncio.StreamWriter(self.uart, {})
         
         # Initialize the GRBL_EN pin for monitoring move completion
-        self.grbl_en = Pin(pins.GRBL_EN, Pin.IN)
+        self.grbl_en = Pin(GRBL_EN, Pin.IN)
         
-        # Command constants
-        self.RESET_POSITION = b'G92X0Y0\n'
+        # Edge flag set from the GRBL_EN interrupt; ThreadSafeFlag is the
+        # asyncio primitive that may be set from an interrupt handler
+        self._en_edge = asyncio.ThreadSafeFlag()
+        self._low_seen = False  # GRBL_EN settled low since the move was sent
+        self.grbl_en.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=self._on_en_edge)
         
-        # Response timeout
-        self.response_timeout_ms = constants.GRBL_TIMEOUT_MS
+        # Encoded move commands keyed by (distance_mm, feed_rate)
+        self._cmd_cache = {}
         
         print("GRBL Tester initialized")
     
-    def send_command(self, command):
+    def _on_en_edge(self, pin):
+        """
+        Wake the task waiting for GRBL_EN edges. Runs in interrupt context.
+        
+        The handler only sets a flag. Debouncing happens in the waiting task,
+        which reads the pin again EN_SETTLE_MS after the edge, so the interrupt
+        never spins sampling the pin.
+        
+        Args:
+            pin: The Pin object that triggered the interrupt.
+        """
+        self._en_edge.set()
+    
+    async def send_command(self, command):
         """
         Send a command to the GRBL controller.
         
@@ -66,22 +119,40 @@ class GRBLTester:
         Returns:
             bool: True if command was sent successfully, False otherwise.
         """
+        return await self.send_batch((command,))
+    
+    async def send_batch(self, commands):
+        """
+        Send several commands to the GRBL controller in a single UART write.
+        
+        Args:
+            commands: The commands to send (bytes or strings); a trailing newline
+                is added to any command that lacks one.
+            
+        Returns:
+            bool: True if the commands were sent successfully, False otherwise.
+        """
         try:
-            if isinstance(command, str):
-                command = command.encode()
-                
-            if not command.endswith(b'\n'):
-                command += b'\n'
-                
-            print(f"Sending: {command.decode().strip()}")
-            self.uart.write(command)
+            lines = []
+            for command in commands:
+                if isinstance(command, str):
+                    command = command.encode()
+                if not command.endswith(b'\n'):
+                    command += b'\n'
+                lines.append(command)
+            data = b''.join(lines)
+            
+            if _DEBUG:
+                print(f"Sending: {data.decode().strip()}")
+            self.swriter.write(data)
+            await self.swriter.drain()
             return True
             
         except Exception as e:
             print(f"Error sending command: {e}")
             return False
     
-    def read_response(self, timeout_ms=None):
+    async def read_response(self, timeout_ms=None):
         """
         Read a response from the GRBL controller.
         
@@ -92,39 +163,21 @@ class GRBLTester:
             str or None: The response, or None if a timeout occurs.
         """
         if timeout_ms is None:
-            timeout_ms = self.response_timeout_ms
-            
-        start_time = time.ticks_ms()
-        response = b''
+            timeout_ms = GRBL_TIMEOUT_MS
         
-        # Wait for data from GRBL
-        while self.uart.any() == 0:
-            time.sleep_ms(10)
-            
-            # Check for timeout
-            if time.ticks_ms() - start_time > timeout_ms:
-                print(f"Timeout waiting for response (after {timeout_ms}ms)")
-                return None
-        
-        # Read all available data
-        while self.uart.any() > 0:
-            data = self.uart.read(1)
-            if data:
-                response += data
-                
-            # Small delay to allow more data to arrive
-            time.sleep_ms(5)
-            
-            # Check for extended timeout
-            if time.ticks_ms() - start_time > timeout_ms * 2:
-                print("Extended timeout while reading response")
-                break
+        # Wait for a complete line; the event loop runs other tasks meanwhile
+        try:
+            response = await asyncio.wait_for_ms(self.sreader.readline(), timeout_ms)
+        except asyncio.TimeoutError:
+            print(f"Timeout waiting for response (after {timeout_ms}ms)")
+            return None
         
         # Decode and return the response
         if response:
             try:
                 decoded = response.decode('utf-8', 'ignore').strip()
-                print(f"Received: {decoded}")
+                if _DEBUG:
+                    print(f"Received: {decoded}")
                 return decoded
             except UnicodeError:
                 print(f"Error decoding response: {response}")
@@ -132,20 +185,21 @@ class GRBLTester:
         
         return None
     
-    def reset_position(self):
+    async def reset_position(self):
         """
         Reset the current position to zero.
         
         Returns:
             bool: True if reset was successful, False otherwise.
         """
-        print("Resetting position to zero")
-        if self.send_command(self.RESET_POSITION):
-            response = self.read_response()
+        if _DEBUG:
+            print("Resetting position to zero")
+        if await self.send_command(_RESET_POSITION):
+            response = await self.read_response()
             return response is not None
         return False
     
-    def move(self, distance_mm, feed_rate=None):
+    async def move(self, distance_mm, feed_rate=None):
         """
         Send a movement command to GRBL.
         
@@ -157,60 +211,141 @@ class GRBLTester:
             bool: True if command was sent successfully, False otherwise.
         """
         if feed_rate is None:
-            feed_rate = constants.GRBL_PUMP_RATE
+            feed_rate = GRBL_PUMP_RATE
             
-        command = f"G1X{distance_mm}F{feed_rate}"
-        print(f"Moving {distance_mm}mm at F{feed_rate}")
-        
-        if self.send_command(command):
-            response = self.read_response()
+        # The test sequences repeat the same few moves, so encode each one once
+        key = (distance_mm, feed_rate)
+        command = self._cmd_cache.get(key)
+        if command is None:
+            if len(self._cmd_cache) >= MOVE_CACHE_SIZE:
+                self._cmd_cache.clear()
+            command = f"G1X{distance_mm}F{feed_rate}\n".encode()
+            self._cmd_cache[key] = command
+        if _DEBUG:
+            print(f"Moving {distance_mm}mm at F{feed_rate}")
+        
+        # Discard stale edges before GRBL can start this move
+        self._low_seen = False
+        self._en_edge.clear()
+        
+        if await self.send_command(command):
+            response = await self.read_response()
             return response is not None
         return False
     
-    def wait_for_completion(self, timeout_ms=None):
+    async def stream_commands(self, commands):
         """
-        Wait for GRBL to complete the current move by monitoring GRBL_EN pin.
+        Stream commands to GRBL using character-counting flow control.
+        
+        Commands are sent while the unacknowledged bytes fit in GRBL's receive
+        buffer, so the planner can join consecutive moves. Commands that fit are
+        sent together in one write, just before waiting for acknowledgements.
         
         Args:
-            timeout_ms: Timeout in milliseconds. Default is 5× GRBL timeout.
+            commands: A list of commands (bytes or strings).
             
         Returns:
-            bool: True if move completed successfully, False if timeout.
+            bool: True if every command was acknowledged with 'ok', False otherwise.
         """
-        if timeout_ms is None:
-            timeout_ms = self.response_timeout_ms * 5
-            
-        start_time = time.ticks_ms()
+        in_flight = []  # Lengths of unacknowledged commands, oldest first
+        pending = []  # Commands counted in the window but not yet written
+        used = 0
+        success = True
         
-        # First, look for GRBL_EN to go low (indicating move in progress)
-        print("Waiting for GRBL to start movement (GRBL_EN should go LOW)")
-        low_detected = False
+        # Discard stale edges before GRBL can start the first move
+        self._low_seen = False
+        self._en_edge.clear()
         
-        while time.ticks_ms() - start_time < timeout_ms:
-            if self.grbl_en.value() == 0:
-                print("Movement started (GRBL_EN is LOW)")
-                low_detected = True
-                break
-            time.sleep_ms(10)
+        for command in commands:
+            if isinstance(command, str):
+                command = command.encode()
+            if not command.endswith(b'\n'):
+                command += b'\n'
+            
+            # Wait for acknowledgements until the command fits in GRBL's buffer
+            while in_flight and used + len(command) > GRBL_STREAM_WINDOW:
+                if pending:
+                    if not await self.send_batch(pending):
+                        return False
+                    pending = []
+                response = await self.read_response()
+                if response is None:
+                    return False
+                if response == 'ok' or response.startswith('error'):
+                    success = success and response == 'ok'
+                    used -= in_flight.pop(0)
+            
+            pending.append(command)
+            in_flight.append(len(command))
+            used += len(command)
         
-        if not low_detected:
-            print("Warning: Movement may not have started (GRBL_EN stayed HIGH)")
-            print("Check if GRBL controller is powered and connected")
+        # Send the last batch, then collect the remaining acknowledgements
+        if pending and not await self.send_batch(pending):
             return False
+        while in_flight:
+            response = await self.read_response()
+            if response is None:
+                return False
+            if response == 'ok' or response.startswith('error'):
+                success = success and response == 'ok'
+                in_flight.pop(0)
+        
+        return success
+    
+    async def _wait_for_edges(self):
+        """
+        Wait for GRBL_EN to go low and then high again, logging each edge.
+        
+        After each edge the pin is left to settle for EN_SETTLE_MS and read again,
+        so noise spikes on a long GRBL cable do not register as edges. An edge that
+        arrived before this call leaves the flag set and is handled the same way,
+        and intermediate pulses between streamed moves just restart the wait for HIGH.
+        """
+        if _DEBUG:
+            print("Waiting for GRBL to start movement (GRBL_EN should go LOW)")
+        while True:
+            await self._en_edge.wait()
+            await asyncio.sleep_ms(EN_SETTLE_MS)
+            if not self.grbl_en.value():
+                if not self._low_seen:
+                    self._low_seen = True
+                    if _DEBUG:
+                        print("Movement started (GRBL_EN is LOW)")
+                        print("Waiting for GRBL to complete movement (GRBL_EN should go HIGH)")
+            elif self._low_seen:
+                if _DEBUG:
+                    print("Movement completed (GRBL_EN is HIGH)")
+                return
+    
+    async def wait_for_completion(self, timeout_ms=None):
+        """
+        Wait for GRBL to complete the current move by monitoring GRBL_EN edges.
+        
+        The GRBL_EN interrupt signals each edge, so this coroutine sleeps until
+        an edge arrives instead of polling the pin. A single wait_for_ms bounds
+        both edges, and the edge wait is cancelled cleanly on timeout.
+        
+        Args:
+            timeout_ms: Timeout in milliseconds. Default is 5× GRBL timeout.
             
-        # Next, wait for GRBL_EN to go high (indicating move complete)
-        print("Waiting for GRBL to complete movement (GRBL_EN should go HIGH)")
-        
-        while time.ticks_ms() - start_time < timeout_ms:
-            if self.grbl_en.value() == 1:
-                print("Movement completed (GRBL_EN is HIGH)")
-                return True
-            time.sleep_ms(10)
-            
-        print(f"Timeout waiting for movement completion (after {timeout_ms}ms)")
-        return False
+        Returns:
+            bool: True if move completed successfully, False if timeout.
+        """
+        if timeout_ms is None:
+            timeout_ms = GRBL_TIMEOUT_MS * 5
+        
+        try:
+            await asyncio.wait_for_ms(self._wait_for_edges(), timeout_ms)
+            return True
+        except asyncio.TimeoutError:
+            if not self._low_seen:
+                print("Warning: Movement may not have started (GRBL_EN stayed HIGH)")
+                print("Check if GRBL controller is powered and connected")
+            else:
+                print(f"Timeout waiting for movement completion (after {timeout_ms}ms)")
+            return False
     
-    def test_communication(self):
+    async def test_communication(self):
         """
         Test basic communication with the GRBL controller.
         
@@ -221,12 +356,12 @@ class GRBLTester:
         print("Sending status query command")
         
         # Send a simple status query
-        if not self.send_command('?'):
+        if not await self.send_command('?'):
             print("Failed to send status query")
             return False
             
         # Read response
-        response = self.read_response()
+        response = await self.read_response()
         if response is None:
             print("No response from GRBL controller")
             print("Check if GRBL is powered and connected correctly")
@@ -235,7 +370,7 @@ class GRBLTester:
         print("Communication test successful")
         return True
     
-    def test_position_reset(self):
+    async def test_position_reset(self):
         """
         Test position reset command.
         
@@ -243,9 +378,9 @@ class GRBLTester:
             bool: True if reset was successful, False otherwise.
         """
         print("\n--- Testing Position Reset ---")
-        return self.reset_position()
+        return await self.reset_position()
     
-    def test_movement(self, distance_mm=10):
+    async def test_movement(self, distance_mm=10):
         """
         Test a simple movement.
         
@@ -258,24 +393,24 @@ class GRBLTester:
         print(f"\n--- Testing {distance_mm}mm Movement ---")
         
         # Reset position first
-        if not self.reset_position():
+        if not await self.reset_position():
             print("Failed to reset position")
             return False
             
         # Send movement command
-        if not self.move(distance_mm):
+        if not await self.move(distance_mm):
             print("Failed to send movement command")
             return False
             
         # Wait for completion
-        if not self.wait_for_completion():
+        if not await self.wait_for_completion():
             print("Movement did not complete")
             return False
             
         print(f"Successfully moved {distance_mm}mm")
         return True
     
-    def test_backward_movement(self, distance_mm=10):
+    async def test_backward_movement(self, distance_mm=10):
         """
         Test a backward movement.
         
@@ -287,9 +422,9 @@ class GRBLTester:
         """
         # Ensure distance is negative for backward movement
         distance_mm = -abs(distance_mm)
-        return self.test_movement(distance_mm)
+        return await self.test_movement(distance_mm)
     
-    def test_movement_sequence(self):
+    async def test_movement_sequence(self):
         """
         Test a sequence of movements.
         
@@ -299,7 +434,7 @@ class GRBLTester:
         print("\n--- Testing Movement Sequence ---")
         
         # Reset position
-        if not self.reset_position():
+        if not await self.reset_position():
             print("Failed to reset position")
             return False
         
@@ -318,21 +453,21 @@ class GRBLTester:
         for distance, description in sequence:
             print(f"\nTesting {description} movement: {distance}mm")
             
-            if not self.move(distance):
+            if not await self.move(distance):
                 print(f"Failed to send {description} movement command")
                 success = False
                 break
                 
-            if not self.wait_for_completion():
+            if not await self.wait_for_completion():
                 print(f"{description} movement did not complete")
                 success = False
                 break
                 
             print(f"Successfully completed {description} movement")
-            time.sleep(1)  # Pause between movements
+            await asyncio.sleep(SEQUENCE_STEP_SETTLE_S)  # Let the mechanics settle
         
         # Reset position at the end
-        self.reset_position()
+        await self.reset_position()
         
         if success:
             print("\nAll movements in sequence completed successfully")
@@ -341,24 +476,54 @@ class GRBLTester:
             
         return success
     
-    def run_all_tests(self):
+    async def test_streamed_sequence(self):
+        """
+        Test streaming a sequence of movements in one go.
+        
+        Returns:
+            bool: True if the streamed sequence completed, False otherwise.
+        """
+        print("\n--- Testing Streamed Movement Sequence ---")
+        
+        # Reset position
+        if not await self.reset_position():
+            print("Failed to reset position")
+            return False
+        
+        # Same net-zero sequence as test_movement_sequence, sent back-to-back
+        feed_rate = GRBL_PUMP_RATE
+        distances = (10, 50, -30, 100, -100, -30)
+        if not await self.stream_commands([f"G1X{d}F{feed_rate}" for d in distances]):
+            print("Failed to stream movement sequence")
+            return False
+        
+        if not await self.wait_for_completion():
+            print("Streamed movement sequence did not complete")
+            return False
+        
+        await self.reset_position()
+        print("Streamed movement sequence completed successfully")
+        return True
+    
+    async def run_all_tests(self):
         """Run all GRBL interface tests sequentially."""
         print("\n=== Starting GRBL Interface Test Sequence ===")
         
         # Test communication first
-        if not self.test_communication():
+        if not await self.test_communication():
             print("Communication test failed, aborting remaining tests")
             return False
         
         # Test position reset
-        self.test_position_reset()
+        await self.test_position_reset()
         
         # Test individual movements
-        self.test_movement(10)
-        self.test_backward_movement(10)
+        await self.test_movement(10)
+        await self.test_backward_movement(10)
         
         # Test movement sequence
-        self.test_movement_sequence()
+        await self.test_movement_sequence()
+        await self.test_streamed_sequence()
         
         print("\n=== GRBL Interface Test Sequence Complete ===")
         return True
@@ -380,23 +545,26 @@ if __name__ == "__main__":
     print("4: Test backward movement (10mm)")
     print("5: Test movement sequence")
     print("6: Run all tests")
+    print("7: Test streamed movement sequence")
     
     try:
-        choice = input("Enter test number (1-6): ")
+        choice = input("Enter test number (1-7): ")
         choice = int(choice.strip())
         
         if choice == 1:
-            tester.test_communication()
+            asyncio.run(tester.test_communication())
         elif choice == 2:
-            tester.test_position_reset()
+            asyncio.run(tester.test_position_reset())
         elif choice == 3:
-            tester.test_movement(10)
+            asyncio.run(tester.test_movement(10))
         elif choice == 4:
-            tester.test_backward_movement(10)
+            asyncio.run(tester.test_backward_movement(10))
         elif choice == 5:
-            tester.test_movement_sequence()
+            asyncio.run(tester.test_movement_sequence())
         elif choice == 6:
-            tester.run_all_tests()
+            asyncio.run(tester.run_all_tests())
+        elif choice == 7:
+            asyncio.run(tester.test_streamed_sequence())
         else:
             print("Invalid choice")
     
@@ -408,7 +576,7 @@ if __name__ == "__main__":
     finally:
         # Reset the position before exiting
         try:
-            tester.reset_position()
+            asyncio.run(tester.reset_position())
         except:
             pass
         print("Test complete, GRBL position reset")
\ No newline at end of file
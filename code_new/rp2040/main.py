@@ -2,8 +2,8 @@
 main.py - Main Program for VHS Coffeeman
 
 This is the main entry point for the VHS Coffeeman system, running on a Raspberry Pi Pico
-(RP2040) with CircuitPython. It initializes all system components and implements the main
-event loop.
+(RP2040) with CircuitPython. It initializes all system components and runs the main
+asyncio tasks.
 
 The system dispenses drinks through a modified VHS player, receiving recipes from a
 Raspberry Pi over serial communication and controlling peristaltic pumps via a GRBL controller.
@@ -21,11 +21,10 @@ System Components:
 Main Program Flow:
     1. Import all necessary modules and CircuitPython libraries
     2. Initialize all system components
-    3. Enter the main event loop, which:
-       - Checks for incoming serial commands
-       - Processes commands through the state machine
-       - Handles any system events or timeouts
-       - Implements watchdog functionality for safety
+    3. Run the asyncio tasks:
+       - The serial task waits for incoming commands and processes them
+         through the state machine
+       - With _DEBUG set, the housekeeping task periodically reports free memory
 
 Serial Protocol:
     Commands from Raspberry Pi:
@@ -40,24 +39,36 @@ Serial Protocol:
         - COMPLETE
         - ERROR:message
 
-The main loop is non-blocking and handles all operations in an event-driven manner.
-It checks for incoming commands, processes them through the state machine, and sends
-status updates back to the Raspberry Pi as appropriate.
+The tasks are event-driven: the serial task sleeps until a complete command line
+arrives rather than polling on a fixed delay, processes it through the state machine,
+and sends status updates back to the Raspberry Pi as appropriate.
+
+A GRBLError (GRBL stopped acknowledging commands) is recovered in place: the pumps are
+disabled, GRBL is soft-reset, the error is reported and the tasks are restarted. Only
+other unexpected exceptions reboot the system with supervisor.reload().
+
+Garbage collection is allocation-driven: after initialization a gc.threshold() is set
+to a quarter of the free heap, so the collector runs when that much has been allocated
+rather than on a fixed timer, and each pause covers a smaller heap.
 """
 
-import time
+import asyncio
 import supervisor
 import gc
+import micropython
+from micropython import const
 
 # Import system components
-from config import constants
-from grbl_interface import GRBLInterface
+from grbl_interface import GRBLInterface, GRBLError
 from pump_controller import PumpController
 from vcr_controller import VCRController
 from serial_comm import SerialCommunication
 from maintenance import Maintenance
 from state_machine import StateMachine
 
+# Set to 1 to report free memory periodically; when 0 the compiler drops the task
+_DEBUG = const(0)
+
 # Track initialization status
 initialized = False
 
@@ -70,6 +81,9 @@ def initialize_system():
     """
     print("Initializing VHS Coffeeman system...")
     
+    # Reserve memory so exceptions raised in interrupt handlers can be reported
+    micropython.alloc_emergency_exception_buf(100)
+    
     # Initialize GRBL interface
     print("Initializing GRBL interface...")
     grbl = GRBLInterface()
@@ -99,9 +113,49 @@ def initialize_system():
         maintenance=maintenance
     )
     
+    # Talk to GRBL last so its response wait does not delay the other subsystems
+    print("Starting GRBL interface...")
+    if not grbl.start():
+        print("Warning: GRBL did not acknowledge position reset")
+    
+    # Collect init garbage, then trigger GC after a quarter of the free heap is allocated
+    gc.collect()
+    gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+    
     print("System initialization complete")
     return (grbl, pump_controller, vcr_controller, serial, maintenance, state_machine)
 
+async def serial_task(serial, state_machine):
+    """
+    Wait for commands from the Raspberry Pi and process them.
+    
+    Args:
+        serial: The SerialCommunication instance to read commands from.
+        state_machine: The StateMachine instance that handles each command.
+    """
+    while True:
+        command = await serial.next_command()
+        state_machine.handle_command(command)
+
+async def housekeeping_task():
+    """Report free memory every 60 seconds."""
+    while True:
+        await asyncio.sleep(60)
+        print(f"Free memory: {gc.mem_free()} bytes")
+
+async def run_tasks(serial, state_machine):
+    """
+    Run the serial task, and the housekeeping task when debugging, until one fails.
+    
+    Args:
+        serial: The SerialCommunication instance to read commands from.
+        state_machine: The StateMachine instance that handles each command.
+    """
+    if _DEBUG:
+        await asyncio.gather(serial_task(serial, state_machine), housekeeping_task())
+    else:
+        await serial_task(serial, state_machine)
+
 def main():
     """Main program entry point."""
     global initialized
@@ -117,7 +171,6 @@ def main():
             initialized = True
             
             # Output memory usage after initialization
-            gc.collect()
             print(f"Free memory after initialization: {gc.mem_free()} bytes")
             
         except Exception as e:
@@ -127,28 +180,18 @@ def main():
             return
     
     try:
-        # Main event loop
+        # Main event loop; GRBL communication errors restart it instead of rebooting
         print("Entering main event loop")
-        last_memory_check = time.monotonic()
-        
         while True:
-            # Check for incoming commands
-            command = serial.check_for_command()
-            if command:
-                # Process the command through the state machine
-                state_machine.handle_command(command)
-            
-            # Perform periodic tasks
-            current_time = time.monotonic()
-            
-            # Check memory usage every 60 seconds
-            if current_time - last_memory_check >= 60:
-                gc.collect()
-                print(f"Free memory: {gc.mem_free()} bytes")
-                last_memory_check = current_time
-            
-            # Short delay to prevent CPU hogging
-            time.sleep_ms(constants.EVENT_LOOP_DELAY_MS)
+            try:
+                asyncio.run(run_tasks(serial, state_machine))
+                
+            except GRBLError as e:
+                print(f"GRBL error: {e}")
+                pump_controller.disable_all()
+                asyncio.run(grbl.soft_reset())
+                serial.send_status("ERROR", str(e))
+                state_machine.reset_system()
             
     except Exception as e:
         print(f"Error in main loop: {e}")
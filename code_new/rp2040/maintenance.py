@@ -31,17 +31,19 @@ Usage:
     # Initialize the maintenance controller
     maintenance = Maintenance(pump_controller)
     
-    # Execute maintenance commands
-    maintenance.prime_all()
-    maintenance.clean_all()
-    maintenance.control_pump(pump_index=3, direction="FORWARD", amount_mm=100)
+    # Execute maintenance commands (coroutines, run from an asyncio task)
+    await maintenance.prime_all()
+    await maintenance.clean_all()
+    await maintenance.control_pump(pump_index=3, direction="FORWARD", amount_mm=100)
     
     # Execute a command from serial
-    maintenance.execute_command("PRIME_ALL")
-    maintenance.execute_command("PUMP:3:FORWARD:100")
+    await maintenance.execute_command("PRIME_ALL")
+    await maintenance.execute_command("PUMP:3:FORWARD:100")
 
 The maintenance operations include safety checks and proper sequencing to prevent
-damage to the pumps or other components.
+damage to the pumps or other components. Every operation is a coroutine that moves
+under the pump controller's motion lock, so cancelling the task running it stops the
+pumps mid-move.
 
 This module depends on:
     - config.py for maintenance settings
@@ -49,7 +51,19 @@ This module depends on:
     - grbl_interface.py for stepper motor control
 """
 
-from config import constants, commands
+from micropython import const
+from config import commands, NUM_PUMPS, MM_PER_OZ, PRIME_AMOUNT_MM, CLEAN_AMOUNT_MM, GRBL_PUMP_RATE
+from grbl_interface import GRBLError
+
+# Set to 1 to print maintenance progress; when 0 the compiler drops those prints
+_DEBUG = const(0)
+
+# Set to 0 to also drop the prints for invalid commands and failed pumps
+_LOG_ERRORS = const(1)
+
+# Prime and clean moves never change, so their G-code is encoded once at import
+_PRIME_GCODE = b'G1X%dF%d\n' % (PRIME_AMOUNT_MM, GRBL_PUMP_RATE)
+_CLEAN_GCODE = b'G1X-%dF%d\n' % (CLEAN_AMOUNT_MM, GRBL_PUMP_RATE)
 
 class Maintenance:
     """Manages maintenance operations."""
@@ -62,62 +76,91 @@ class Maintenance:
             pump_controller: A PumpController instance for controlling pumps.
         """
         self.pump_controller = pump_controller
+        
+        # Maintenance actions mapped to handlers that take the command itself
+        self._handlers = {
+            commands.PRIME_ALL: lambda command: self.prime_all(),
+            commands.CLEAN_ALL: lambda command: self.clean_all(),
+            commands.PUMP: self._handle_pump_dict,
+        }
     
-    def prime_all(self):
+    async def prime_all(self, parallel=True):
         """
         Prime all pumps by running them forward to fill lines.
         
+        Args:
+            parallel: If True, run every pump together on one move. If False, run
+                the pumps one at a time (useful for diagnosing a single line).
+        
         Returns:
             bool: True if all pumps were primed successfully, False otherwise.
         """
-        print("Priming all pumps")
+        if _DEBUG:
+            print("Priming all pumps")
+        
+        # One move with every pump enabled
+        if parallel:
+            return await self.pump_controller.run_raw(_PRIME_GCODE)
+        
+        # Bind the controller method and encoded move to locals for the loop
+        run_raw = self.pump_controller.run_raw
+        gcode = _PRIME_GCODE
         
         # Track overall success
         success = True
         
         # Run each pump forward to prime lines
-        for pump_index in range(constants.NUM_PUMPS):
-            print(f"Priming pump {pump_index}")
+        for pump_index in range(NUM_PUMPS):
+            if _DEBUG:
+                print("Priming pump", pump_index)
             
             # Run the pump forward by the prime amount
-            if not self.pump_controller.run_pump(
-                pump_index, 
-                commands.FORWARD, 
-                constants.PRIME_AMOUNT_MM
-            ):
-                print(f"Failed to prime pump {pump_index}")
+            if not await run_raw(gcode, pump_index):
+                if _LOG_ERRORS:
+                    print("Failed to prime pump", pump_index)
                 success = False
         
         return success
     
-    def clean_all(self):
+    async def clean_all(self, parallel=True):
         """
         Clean all pumps by running them backward to empty lines.
         
+        Args:
+            parallel: If True, run every pump together on one move. If False, run
+                the pumps one at a time (useful for diagnosing a single line).
+        
         Returns:
             bool: True if all pumps were cleaned successfully, False otherwise.
         """
-        print("Cleaning all pumps")
+        if _DEBUG:
+            print("Cleaning all pumps")
+        
+        # One move with every pump enabled
+        if parallel:
+            return await self.pump_controller.run_raw(_CLEAN_GCODE)
+        
+        # Bind the controller method and encoded move to locals for the loop
+        run_raw = self.pump_controller.run_raw
+        gcode = _CLEAN_GCODE
         
         # Track overall success
         success = True
         
         # Run each pump backward to empty lines
-        for pump_index in range(constants.NUM_PUMPS):
-            print(f"Cleaning pump {pump_index}")
+        for pump_index in range(NUM_PUMPS):
+            if _DEBUG:
+                print("Cleaning pump", pump_index)
             
             # Run the pump backward by the clean amount
-            if not self.pump_controller.run_pump(
-                pump_index, 
-                commands.BACKWARD, 
-                constants.CLEAN_AMOUNT_MM
-            ):
-                print(f"Failed to clean pump {pump_index}")
+            if not await run_raw(gcode, pump_index):
+                if _LOG_ERRORS:
+                    print("Failed to clean pump", pump_index)
                 success = False
         
         return success
     
-    def control_pump(self, pump_index, direction, amount_mm):
+    async def control_pump(self, pump_index, direction, amount_mm):
         """
         Control a specific pump directly.
         
@@ -129,22 +172,56 @@ class Maintenance:
         Returns:
             bool: True if the pump was controlled successfully, False otherwise.
         """
-        print(f"Controlling pump {pump_index}: {direction} {amount_mm}mm")
+        if _DEBUG:
+            print("Controlling pump", pump_index, direction, amount_mm, "mm")
         
         # Validate direction
         if direction not in [commands.FORWARD, commands.BACKWARD]:
-            print(f"Invalid direction: {direction}")
+            if _LOG_ERRORS:
+                print("Invalid direction:", direction)
             return False
         
         # Validate amount (must be positive)
         if amount_mm <= 0:
-            print(f"Invalid amount: {amount_mm}mm (must be positive)")
+            if _LOG_ERRORS:
+                print("Invalid amount:", amount_mm, "mm (must be positive)")
             return False
         
-        # Run the pump in the specified direction
-        return self.pump_controller.run_pump(pump_index, direction, amount_mm)
+        # Run the pump in the specified direction; backward is a negative distance
+        if direction == commands.BACKWARD:
+            amount_mm = -amount_mm
+        return await self.pump_controller.run_pump(pump_index, amount_mm)
     
-    def execute_command(self, command):
+    async def _handle_pump_dict(self, command):
+        """
+        Handle a parsed PUMP maintenance command.
+        
+        Args:
+            command: A parsed command object with 'pump_index', 'direction' and 'amount'.
+            
+        Returns:
+            bool: True if the pump was controlled successfully, False otherwise.
+        """
+        if not isinstance(command, dict):
+            if _LOG_ERRORS:
+                print("PUMP command requires pump index, direction and amount")
+            return False
+        
+        # Extract pump control parameters
+        pump_index = command.get('pump_index')
+        direction = command.get('direction')
+        amount = command.get('amount')
+        
+        # Convert amount from oz to mm if needed
+        if amount <= 10:  # Assume it's in oz if small number
+            amount_mm = amount * MM_PER_OZ
+        else:
+            amount_mm = amount
+        
+        # Control the pump
+        return await self.control_pump(pump_index, direction, amount_mm)
+    
+    async def execute_command(self, command):
         """
         Execute a maintenance command.
         
@@ -155,49 +232,29 @@ class Maintenance:
             bool: True if the command was executed successfully, False otherwise.
         """
         try:
-            # If the command is a string, handle simple commands
+            # A string is the action itself; a parsed command carries it in 'action'
             if isinstance(command, str):
-                if command == commands.PRIME_ALL:
-                    return self.prime_all()
-                elif command == commands.CLEAN_ALL:
-                    return self.clean_all()
-                else:
-                    print(f"Unknown maintenance command: {command}")
-                    return False
-            
-            # If the command is a dictionary (parsed command object)
+                action = command
             elif isinstance(command, dict):
                 action = command.get('action')
-                
-                if action == commands.PRIME_ALL:
-                    return self.prime_all()
-                    
-                elif action == commands.CLEAN_ALL:
-                    return self.clean_all()
-                    
-                elif action == commands.PUMP:
-                    # Extract pump control parameters
-                    pump_index = command.get('pump_index')
-                    direction = command.get('direction')
-                    amount = command.get('amount')
-                    
-                    # Convert amount from oz to mm if needed
-                    if amount <= 10:  # Assume it's in oz if small number
-                        amount_mm = amount * constants.MM_PER_OZ
-                    else:
-                        amount_mm = amount
-                    
-                    # Control the pump
-                    return self.control_pump(pump_index, direction, amount_mm)
-                
-                else:
-                    print(f"Unknown maintenance action: {action}")
-                    return False
-            
             else:
-                print(f"Invalid command type: {type(command)}")
+                if _LOG_ERRORS:
+                    print("Invalid command type:", type(command))
+                return False
+            
+            handler = self._handlers.get(action)
+            if handler is None:
+                if _LOG_ERRORS:
+                    print("Unknown maintenance action:", action)
                 return False
+            
+            return await handler(command)
+        
+        except GRBLError:
+            # GRBL has stopped answering; the caller resets it
+            raise
                 
         except Exception as e:
-            print(f"Error executing maintenance command: {e}")
-            return False
\ No newline at end of file
+            if _LOG_ERRORS:
+                print("Error executing maintenance command:", e)
+            return False
@@ -0,0 +1,22 @@
+"""
+manifest.py - MicroPython Freeze Manifest for VHS Coffeeman
+
+This manifest lists the modules that are frozen into the RP2040 firmware image.
+Frozen modules are compiled to bytecode by mpy-cross at build time and executed
+from flash, so they are not parsed at boot and their bytecode and strings do not
+occupy RAM.
+
+Usage:
+    make -C ports/rp2 BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/code_new/rp2040/manifest.py
+
+Modules are compiled at optimization level 3 (mpy-cross -O3), which strips asserts
+and line-number information. Modules that are not listed here are copied to the board
+filesystem as usual; the *_test.py diagnostic tools stay there because they are run
+as scripts, and a frozen module's __main__ block is never executed.
+"""
+
+# Keep the board's default frozen modules (asyncio, etc.)
+include("$(PORT_DIR)/boards/manifest.py")
+
+# Configuration constants, SIO register helpers and the GRBL command interface
+freeze(".", ("config.py", "sio.py", "grbl_interface.py"), opt=3)
@@ -12,9 +12,13 @@ Classes:
 The PumpController class is the primary interface used by other modules. It handles:
     - Initializing all pump objects
     - Enabling/disabling specific pumps
+    - Running every pump together on a single GRBL move (priming/cleaning)
     - Dispensing specific amounts through each pump
     - Coordinating with GRBL for stepper motor control
-    - Error detection and recovery during dispensing
+    - Error detection and recovery during dispensing (a GRBLError is re-raised
+      with the pumps disabled so the caller can reset GRBL)
+    - Serializing motion with an asyncio lock and stopping it on cancellation
+    - Recording dispense failures as numeric codes in a ring buffer (recent_errors)
 
 Usage:
     from pump_controller import PumpController
@@ -22,10 +26,11 @@ Usage:
     
     # Initialize the controller
     grbl = GRBLInterface()
+    grbl.start()
     controller = PumpController(grbl)
     
-    # Dispense a specific amount through a pump
-    controller.dispense(pump_index=0, amount_oz=1.5)
+    # Dispense a specific amount through a pump (from an asyncio task)
+    await controller.dispense(pump_index=0, amount_oz=1.5)
     
     # Disable all pumps
     controller.disable_all()
@@ -42,12 +47,58 @@ Each dispense operation handles the full sequence:
 This module depends on:
     - config.py for pin definitions and conversion factors
     - grbl_interface.py for stepper motor control
+    - sio.py for the SIO GPIO register helpers
 """
 
 import time
-from machine import Pin
-from config import pins, constants
-from grbl_interface import GRBLInterface
+import asyncio
+import micropython
+from micropython import const
+from config import PUMP_PINS, PUMP_MASK, MM_PER_OZ, OZ_SCALE, MIN_PUMP_OZ, MAX_PUMP_OZ
+from grbl_interface import GRBLInterface, GRBLError
+from sio import gpio_out, gpio_set, gpio_clr, init_outputs
+
+# Set to 1 to print per-dispense progress; when 0 the compiler drops those prints
+_DEBUG = const(0)
+
+# Set to 0 to also drop the prints for invalid arguments and failed moves
+_LOG_ERRORS = const(1)
+
+# Dispense error codes, recorded in PumpController.errors instead of printed
+ERR_MOVE = const(1)  # The GRBL move could not be queued
+ERR_TIMEOUT = const(2)  # The move did not complete within the timeout
+ERR_EXCEPTION = const(3)  # An unexpected exception was raised
+ERR_INDEX = const(4)  # A debug build found an out-of-range pump index
+
+# Number of entries kept in the error ring buffer
+_ERROR_LOG_SIZE = const(8)
+
+def oz_to_mm(amount_oz):
+    """
+    Convert fluid ounces to pump travel in millimeters.
+    
+    The amount is rounded to whole hundredths of an ounce once, then scaled in
+    integer math so GRBL always receives an integer distance.
+    
+    Args:
+        amount_oz: The amount in fluid ounces.
+        
+    Returns:
+        int: The distance in millimeters.
+    """
+    return hundredths_to_mm(int(amount_oz * OZ_SCALE + 0.5))
+
+def hundredths_to_mm(amount):
+    """
+    Convert an amount in hundredths of an ounce (1/OZ_SCALE oz) to millimeters.
+    
+    Args:
+        amount: The amount as an integer number of hundredths of an ounce.
+        
+    Returns:
+        int: The distance in millimeters.
+    """
+    return amount * MM_PER_OZ // OZ_SCALE
 
 class Pump:
     """Controls a single peristaltic pump."""
@@ -56,23 +107,26 @@ class Pump:
         """
         Initialize a pump with a specific pin.
         
+        The pin must already be configured as an output; PumpController sets up
+        every pump pin at once. The pump only keeps the pin's bit mask, and
+        enable/disable store it to the SIO set/clear registers from viper.
+        
         Args:
             pin_num: The GPIO pin number for the pump's enable control.
         """
-        self.pin = Pin(pin_num, Pin.OUT)
-        self.disable()  # Start with pump disabled
+        self._mask = 1 << pin_num
     
     def enable(self):
         """Enable the pump (set pin low)."""
-        self.pin.value(0)
+        gpio_clr(self._mask)
     
     def disable(self):
         """Disable the pump (set pin high)."""
-        self.pin.value(1)
+        gpio_set(self._mask)
     
     def is_enabled(self):
         """Check if the pump is enabled."""
-        return self.pin.value() == 0
+        return not gpio_out() & self._mask
 
 class PumpController:
     """Manages multiple pumps and coordinates dispensing operations."""
@@ -87,17 +141,77 @@ class PumpController:
         self.grbl = grbl_interface
         self.pumps = []
         
+        # Configure every pump pin as an output, disabled (high), in one pass
+        init_outputs(PUMP_PINS, PUMP_MASK)
+        
         # Initialize all pumps based on config
-        for pin_num in pins.PUMP_PINS:
+        for pin_num in PUMP_PINS:
             self.pumps.append(Pump(pin_num))
+        self._n_pumps = len(self.pumps)
         
-        # Make sure all pumps are disabled at startup
-        self.disable_all()
+        # Enable pin mask per pump, so the dispense paths can write the SIO
+        # registers directly instead of calling through the Pump objects
+        self._masks = [pump._mask for pump in self.pumps]
+        
+        # Only one motion task may drive GRBL at a time
+        self.motion_lock = asyncio.Lock()
+        
+        # Ring buffer of recent dispense errors, one byte each: code << 4 | pump index
+        self.errors = bytearray(_ERROR_LOG_SIZE)
+        self._error_pos = 0
+    
+    def _log_error(self, code, pump_index):
+        """
+        Record a dispense error in the ring buffer without allocating.
+        
+        Args:
+            code: One of the ERR_* codes.
+            pump_index: The index of the pump that failed.
+        """
+        self.errors[self._error_pos] = (code << 4) | (pump_index & 0x0f)
+        self._error_pos = (self._error_pos + 1) % _ERROR_LOG_SIZE
+    
+    @micropython.native
+    def _fail(self, pump_index, code=0):
+        """
+        Disable a pump after a failed operation and record the failure.
+        
+        Args:
+            pump_index: The index of the pump to disable; ignored if out of range.
+            code: One of the ERR_* codes to log, or 0 to log nothing.
+            
+        Returns:
+            bool: Always False, so callers can return the result directly.
+        """
+        if 0 <= pump_index < self._n_pumps:
+            gpio_set(self._masks[pump_index])
+        if code:
+            self._log_error(code, pump_index)
+        return False
+    
+    def recent_errors(self):
+        """
+        Get the recorded dispense errors, oldest first.
+        
+        Returns:
+            list: (code, pump_index) tuples for each recorded error.
+        """
+        pos = self._error_pos
+        entries = self.errors[pos:] + self.errors[:pos]
+        return [(entry >> 4, entry & 0x0f) for entry in entries if entry]
+    
+    def enable_all(self):
+        """Enable all pumps, so they all follow the next GRBL move."""
+        gpio_clr(PUMP_MASK)
     
     def disable_all(self):
-        """Disable all pumps."""
-        for pump in self.pumps:
-            pump.disable()
+        """Disable all pumps with a single store to the SIO set register."""
+        gpio_set(PUMP_MASK)
+    
+    def stop(self):
+        """Stop all pumping immediately: disable every pump and hold GRBL."""
+        self.disable_all()
+        self.grbl.feed_hold()
     
     def validate_pump_index(self, pump_index):
         """
@@ -112,11 +226,14 @@ class PumpController:
         Raises:
             ValueError: If the pump index is invalid.
         """
-        if pump_index < 0 or pump_index >= len(self.pumps):
-            error_msg = f"Invalid pump index: {pump_index}. Must be between 0 and {len(self.pumps) - 1}"
+        if 0 <= pump_index < self._n_pumps:
+            return True
+        
+        # The message is only built on failure
+        error_msg = f"Invalid pump index: {pump_index}. Must be between 0 and {self._n_pumps - 1}"
+        if _LOG_ERRORS:
             print(error_msg)
-            raise ValueError(error_msg)
-        return True
+        raise ValueError(error_msg)
     
     def validate_amount(self, amount_oz):
         """
@@ -131,13 +248,14 @@ class PumpController:
         Raises:
             ValueError: If the amount is invalid.
         """
-        if amount_oz < constants.MIN_PUMP_OZ or amount_oz > constants.MAX_PUMP_OZ:
-            error_msg = f"Invalid amount: {amount_oz} oz. Must be between {constants.MIN_PUMP_OZ} and {constants.MAX_PUMP_OZ} oz"
-            print(error_msg)
+        if amount_oz < MIN_PUMP_OZ or amount_oz > MAX_PUMP_OZ:
+            error_msg = f"Invalid amount: {amount_oz} oz. Must be between {MIN_PUMP_OZ} and {MAX_PUMP_OZ} oz"
+            if _LOG_ERRORS:
+                print(error_msg)
             raise ValueError(error_msg)
         return True
     
-    def dispense(self, pump_index, amount_oz):
+    async def dispense(self, pump_index, amount_oz):
         """
         Dispense a specific amount through a pump.
         
@@ -148,98 +266,274 @@ class PumpController:
         Returns:
             bool: True if dispensing was successful, False otherwise.
         """
+        # Validate parameters, then convert the amount to millimeters
         try:
-            # Validate parameters
             self.validate_pump_index(pump_index)
             self.validate_amount(amount_oz)
+        except ValueError:
+            return False
+        
+        try:
+            return await self.dispense_fast(pump_index, oz_to_mm(amount_oz))
+            
+        except asyncio.CancelledError:
+            # STOP cancelled this move: halt the pumps and GRBL right away
+            self.stop()
+            raise
+            
+        except GRBLError:
+            # Communication failure: leave recovery to the caller with the pumps off
+            self.disable_all()
+            raise
+            
+        except Exception as e:
+            self._log_error(ERR_EXCEPTION, pump_index)
+            if _DEBUG:
+                print("Error dispensing from pump", pump_index, e)
+            # Make sure the pump is disabled in case of error
+            self.disable_all()
+            return False
+    
+    @micropython.native
+    async def dispense_fast(self, pump_index, distance_mm):
+        """
+        Dispense through a pump without validating the arguments.
+        
+        Fast path for recipes, which validate each ingredient and convert it to
+        millimeters once when it is added. Use dispense() for ad-hoc calls. The
+        body is compiled to native code and its progress prints are debug-only;
+        failures are recorded as ERR_* codes in the errors ring buffer.
+        
+        There is no exception handling here. Native code can raise exceptions,
+        but mpy-cross rejects a bare re-raise ("native raise"), so handlers that
+        clean up and re-raise stay in the plain-Python callers. They guard the
+        whole batch of moves once and disable the pumps if a GRBL call raises
+        (see dispense() and Recipe.execute()). Failures found here are returned
+        as False with an ERR_* code logged.
+        
+        Args:
+            pump_index: The index of the pump to use; must be in range.
+            distance_mm: The distance to move in millimeters.
+            
+        Returns:
+            bool: True if dispensing was successful, False otherwise.
+        """
+        # Recipes validate their pump indices up front; only debug builds re-check
+        if _DEBUG and not 0 <= pump_index < self._n_pumps:
+            return self._fail(pump_index, ERR_INDEX)
+        
+        async with self.motion_lock:
+            mask = self._masks[pump_index]
             
-            # Convert ounces to millimeters
-            distance_mm = amount_oz * constants.MM_PER_OZ
+            # Recover GRBL from a STOP's feed hold before sending anything
+            await self.grbl.clear_hold()
             
             # 1. Enable the pump
-            print(f"Enabling pump {pump_index}")
-            self.pumps[pump_index].enable()
+            if _DEBUG:
+                print("Enabling pump", pump_index)
+            gpio_clr(mask)
             
-            # 2. Send movement command to GRBL
-            print(f"Dispensing {amount_oz} oz ({distance_mm} mm) from pump {pump_index}")
-            if not self.grbl.move(distance_mm):
+            # 2. Send movement command to GRBL; the completion interrupt disables
+            # the pump the moment the move finishes
+            if _DEBUG:
+                print("Dispensing", distance_mm, "mm from pump", pump_index)
+            if not self.grbl.move(distance_mm, release_mask=mask):
                 # If move command failed, disable pump and return False
-                self.pumps[pump_index].disable()
-                return False
+                return self._fail(pump_index, ERR_MOVE)
             
-            # 3. Wait for the move to complete
-            if not self.grbl.wait_for_completion():
+            # 3. Wait for the move to complete (the pump is already disabled)
+            if not await self.grbl.wait_for_completion_async():
                 # If move completion failed, disable pump and return False
-                self.pumps[pump_index].disable()
-                return False
+                return self._fail(pump_index, ERR_TIMEOUT)
             
-            # 4. Disable the pump
-            self.pumps[pump_index].disable()
-            
-            # 5. Reset GRBL position
+            # 4. Reset GRBL position
             self.grbl.reset_position()
             
             return True
-            
-        except Exception as e:
-            print(f"Error dispensing from pump {pump_index}: {e}")
-            # Make sure pump is disabled in case of error
-            if pump_index >= 0 and pump_index < len(self.pumps):
-                self.pumps[pump_index].disable()
-            return False
     
-    def run_pump(self, pump_index, direction, distance_mm):
+    @micropython.native
+    async def dispense_batch(self, pump_indices, distances_mm):
         """
-        Run a pump in a specific direction for a specific distance.
+        Dispense a series of pre-validated moves with one position reset at the end.
+        
+        GRBL is switched to relative positioning for the batch, so consecutive
+        moves need no reset between them; absolute mode is restored and the
+        position re-zeroed once afterwards. Consecutive entries for the same pump
+        are sent as one move, since nothing has to change between them; if
+        they cancel out to 0 mm the pump is left off and no move is sent, as a
+        zero-length move never toggles GRBL_EN and its wait would time out.
+        GRBL's answer to each move is checked once the move completes, and the
+        final reset_position() checks the answers to the mode switches. Like
+        dispense_fast(), nothing is validated and the caller guards against
+        exceptions.
         
         Args:
-            pump_index: The index of the pump to use.
-            direction: The direction to run the pump ("FORWARD" or "BACKWARD").
-            distance_mm: The distance to move in millimeters.
+            pump_indices: Pump index for each move; every index must be in range.
+            distances_mm: Signed distance in millimeters for each move; negative
+                distances run the pump backward.
             
         Returns:
-            bool: True if the operation was successful, False otherwise.
+            int: The number of moves completed; equal to len(pump_indices) on success.
         """
-        try:
-            # Validate pump index
-            self.validate_pump_index(pump_index)
+        async with self.motion_lock:
+            grbl = self.grbl
+            masks = self._masks
+            count = len(pump_indices)
+            done = 0
             
-            # Validate distance
-            if distance_mm <= 0:
-                raise ValueError(f"Invalid distance: {distance_mm} mm. Must be positive")
+            # Recover GRBL from a STOP's feed hold before sending anything
+            await grbl.clear_hold()
+            grbl.relative_mode()
+            while done < count:
+                pump_index = pump_indices[done]
+                mask = masks[pump_index]
+                
+                # Fold following entries for the same pump into this move
+                distance_mm = distances_mm[done]
+                end = done + 1
+                while end < count and pump_indices[end] == pump_index:
+                    distance_mm += distances_mm[end]
+                    end += 1
+                if not distance_mm:
+                    # Forward and backward entries cancelled out; nothing to move
+                    done = end
+                    continue
+                if _DEBUG:
+                    print("Dispensing", distance_mm, "mm from pump", pump_index)
+                
+                # The completion interrupt disables the pump when the move finishes
+                gpio_clr(mask)
+                if not grbl.move(distance_mm, release_mask=mask):
+                    self._fail(pump_index, ERR_MOVE)
+                    break
+                if not await grbl.wait_for_completion_async():
+                    self._fail(pump_index, ERR_TIMEOUT)
+                    break
+                
+                # GRBL answered the move (and the G91 before the first one) long
+                # before it finished, so the answer is waiting; check it
+                if not grbl.read_acks():
+                    self._fail(pump_index, ERR_MOVE)
+                    break
+                done = end
             
-            # Enable the pump
-            self.pumps[pump_index].enable()
+            # Restore absolute positioning and re-zero once for the whole batch
+            grbl.absolute_mode()
+            grbl.reset_position()
             
-            # Move in the appropriate direction
-            success = False
-            if direction == "FORWARD":
-                success = self.grbl.move(distance_mm)
-            elif direction == "BACKWARD":
-                success = self.grbl.move_backward(distance_mm)
-            else:
-                raise ValueError(f"Invalid direction: {direction}. Must be FORWARD or BACKWARD")
+            return done
+    
+    async def run_pump(self, pump_index, distance_mm):
+        """
+        Run a pump for a specific distance.
+        
+        Args:
+            pump_index: The index of the pump to use.
+            distance_mm: The distance to move in millimeters; positive runs the
+                pump forward, negative runs it backward.
             
-            if not success:
-                self.pumps[pump_index].disable()
-                return False
+        Returns:
+            bool: True if the operation was successful, False otherwise.
+        """
+        async with self.motion_lock:
+            try:
+                # Validate pump index
+                self.validate_pump_index(pump_index)
+                
+                # Validate distance
+                if not distance_mm:
+                    raise ValueError("Invalid distance: 0 mm. Must be non-zero")
+                
+                # Recover GRBL from a STOP's feed hold before sending anything
+                await self.grbl.clear_hold()
+                
+                # Enable the pump
+                mask = self._masks[pump_index]
+                gpio_clr(mask)
+                
+                # The sign of the distance sets the direction
+                if not self.grbl.move(distance_mm):
+                    return self._fail(pump_index)
+                
+                # Wait for the move to complete
+                if not await self.grbl.wait_for_completion_async():
+                    return self._fail(pump_index)
+                
+                # Disable the pump
+                gpio_set(mask)
+                
+                # Reset GRBL position
+                self.grbl.reset_position()
+                
+                return True
+                
+            except asyncio.CancelledError:
+                # STOP cancelled this move: halt the pumps and GRBL right away
+                self.stop()
+                raise
+                
+            except GRBLError:
+                # Communication failure: leave recovery to the caller with the pumps off
+                self.disable_all()
+                raise
+                
+            except Exception as e:
+                if _LOG_ERRORS:
+                    print("Error running pump", pump_index, e)
+                # Make sure pump is disabled in case of error
+                return self._fail(pump_index)
+        
+    async def run_raw(self, gcode, pump_index=None):
+        """
+        Run one pump, or every pump, through a pre-encoded G-code move.
+        
+        Args:
+            gcode: A complete G-code move line as bytes, ending in a newline.
+            pump_index: The index of the pump to use, or None to run all pumps.
             
-            # Wait for the move to complete
-            if not self.grbl.wait_for_completion():
-                self.pumps[pump_index].disable()
+        Returns:
+            bool: True if the operation was successful, False otherwise.
+        """
+        async with self.motion_lock:
+            try:
+                # Recover GRBL from a STOP's feed hold before sending anything
+                await self.grbl.clear_hold()
+                
+                # Enable the requested pump(s) with one store of their mask
+                if pump_index is None:
+                    mask = PUMP_MASK
+                else:
+                    self.validate_pump_index(pump_index)
+                    mask = self._masks[pump_index]
+                gpio_clr(mask)
+                
+                # Send the move and wait for it to complete
+                self.grbl.move_raw(gcode)
+                if not await self.grbl.wait_for_completion_async():
+                    self.disable_all()
+                    return False
+                
+                # Disable the pump(s)
+                self.disable_all()
+                
+                # Reset GRBL position
+                self.grbl.reset_position()
+                
+                return True
+                
+            except asyncio.CancelledError:
+                # STOP cancelled this move: halt the pumps and GRBL right away
+                self.stop()
+                raise
+                
+            except GRBLError:
+                # Communication failure: leave recovery to the caller with the pumps off
+                self.disable_all()
+                raise
+                
+            except Exception as e:
+                if _LOG_ERRORS:
+                    print("Error running pre-encoded move:", e)
+                # Make sure pumps are disabled in case of error
+                self.disable_all()
                 return False
-            
-            # Disable the pump
-            self.pumps[pump_index].disable()
-            
-            # Reset GRBL position
-            self.grbl.reset_position()
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error running pump {pump_index}: {e}")
-            # Make sure pump is disabled in case of error
-            if pump_index >= 0 and pump_index < len(self.pumps):
-                self.pumps[pump_index].disable()
-            return False
\ No newline at end of file
@@ -9,23 +9,33 @@ the complete cycle of pump operation including:
 - Disabling the pump
 
 Usage:
-    import time
+    import asyncio
     from pump_test import PumpTester
     
     # Initialize the tester
     tester = PumpTester()
     
     # Test a specific pump forward
-    tester.test_pump(pump_index=0, amount_oz=0.5)
+    asyncio.run(tester.test_pump(pump_index=0, amount_oz=0.5))
     
     # Test a specific pump backward
-    tester.test_pump_backward(pump_index=0, amount_oz=0.5)
+    asyncio.run(tester.test_pump_backward(pump_index=0, amount_oz=0.5))
+    
+    # Stop a pour mid-move, then check the next pour still runs
+    asyncio.run(tester.test_stop_then_pour(pump_index=0, amount_oz=0.5))
+    
+    # Run a batch whose forward and backward entries cancel out
+    asyncio.run(tester.test_cancelling_batch(pump_index=0, amount_oz=0.5))
+
+The tester drives the pumps through a PumpController, so it exercises the same
+pump objects and dispense path as the main program.
 """
 
-import time
-from machine import Pin
-from config import pins, constants
+import asyncio
+from array import array
+from config import MIN_PUMP_OZ, MAX_PUMP_OZ
 from grbl_interface import GRBLInterface
+from pump_controller import PumpController, oz_to_mm
 
 class PumpTester:
     """Provides focused testing for the pump controller system."""
@@ -34,14 +44,19 @@ class PumpTester:
         """Initialize the pump tester with GRBL and pump setup."""
         # Initialize GRBL interface
         self.grbl = GRBLInterface()
+        self.grbl.start()
         
-        # Initialize pump pins
-        self.pumps = []
-        for pin_num in pins.PUMP_PINS:
-            self.pumps.append(Pin(pin_num, Pin.OUT, value=1))  # Start disabled (high)
+        # Use the pump controller's pumps rather than setting up the pins again
+        self.controller = PumpController(self.grbl)
+        self.pumps = self.controller.pumps
+        self._n_pumps = len(self.pumps)
         
         print(f"Pump Tester initialized with {len(self.pumps)} pumps")
     
+    def disable_all(self):
+        """Disable all pumps (drive every enable pin high) in one register write."""
+        self.controller.disable_all()
+    
     def validate_pump_index(self, pump_index):
         """
         Validate that a pump index is valid.
@@ -52,10 +67,10 @@ class PumpTester:
         Returns:
             bool: True if the pump index is valid, False otherwise.
         """
-        if pump_index < 0 or pump_index >= len(self.pumps):
-            print(f"Invalid pump index: {pump_index}. Must be between 0 and {len(self.pumps) - 1}")
-            return False
-        return True
+        if 0 <= pump_index < self._n_pumps:
+            return True
+        print(f"Invalid pump index: {pump_index}. Must be between 0 and {self._n_pumps - 1}")
+        return False
     
     def validate_amount(self, amount_oz):
         """
@@ -67,15 +82,18 @@ class PumpTester:
         Returns:
             bool: True if the amount is valid, False otherwise.
         """
-        if amount_oz < constants.MIN_PUMP_OZ or amount_oz > constants.MAX_PUMP_OZ:
-            print(f"Invalid amount: {amount_oz} oz. Must be between {constants.MIN_PUMP_OZ} and {constants.MAX_PUMP_OZ} oz")
+        if amount_oz < MIN_PUMP_OZ or amount_oz > MAX_PUMP_OZ:
+            print(f"Invalid amount: {amount_oz} oz. Must be between {MIN_PUMP_OZ} and {MAX_PUMP_OZ} oz")
             return False
         return True
     
-    def test_pump(self, pump_index, amount_oz):
+    async def test_pump(self, pump_index, amount_oz):
         """
         Test a pump by dispensing a specific amount forward.
         
+        The pump is driven through PumpController.run_pump(), the same enable,
+        move, wait and disable path used for real pours.
+        
         Args:
             pump_index: The index of the pump to test.
             amount_oz: The amount to dispense in fluid ounces.
@@ -89,54 +107,24 @@ class PumpTester:
         if not self.validate_pump_index(pump_index) or not self.validate_amount(amount_oz):
             return False
         
-        try:
-            # Convert ounces to millimeters
-            distance_mm = amount_oz * constants.MM_PER_OZ
-            
-            # 1. Reset GRBL position
-            print("Resetting GRBL position")
-            self.grbl.reset_position()
-            
-            # 2. Enable the pump
-            print(f"Enabling pump {pump_index}")
-            self.pumps[pump_index].value(0)  # Low = enabled
-            
-            # 3. Send movement command to GRBL
-            print(f"Dispensing {amount_oz} oz ({distance_mm} mm) from pump {pump_index}")
-            if not self.grbl.move(distance_mm):
-                # If move command failed, disable pump and return False
-                print("Failed to send GRBL movement command")
-                self.pumps[pump_index].value(1)  # Disable pump
-                return False
-            
-            # 4. Wait for the move to complete
-            if not self.grbl.wait_for_completion():
-                # If move completion failed, disable pump and return False
-                print("Failed to complete GRBL movement")
-                self.pumps[pump_index].value(1)  # Disable pump
-                return False
-            
-            # 5. Disable the pump
-            print(f"Disabling pump {pump_index}")
-            self.pumps[pump_index].value(1)  # High = disabled
-            
-            # 6. Reset GRBL position
-            self.grbl.reset_position()
-            
-            print(f"Pump {pump_index} forward test completed successfully")
-            return True
-            
-        except Exception as e:
-            print(f"Error testing pump {pump_index}: {e}")
-            # Make sure pump is disabled in case of error
-            if pump_index >= 0 and pump_index < len(self.pumps):
-                self.pumps[pump_index].value(1)  # Disable pump
+        # Convert ounces to millimeters
+        distance_mm = oz_to_mm(amount_oz)
+        
+        print(f"Dispensing {amount_oz} oz ({distance_mm} mm) from pump {pump_index}")
+        if not await self.controller.run_pump(pump_index, distance_mm):
+            print(f"Pump {pump_index} forward test failed")
             return False
+        
+        print(f"Pump {pump_index} forward test completed successfully")
+        return True
     
-    def test_pump_backward(self, pump_index, amount_oz):
+    async def test_pump_backward(self, pump_index, amount_oz):
         """
         Test a pump by dispensing a specific amount backward.
         
+        The pump is driven through PumpController.run_pump(), the same enable,
+        move, wait and disable path used for real pours.
+        
         Args:
             pump_index: The index of the pump to test.
             amount_oz: The amount to dispense in fluid ounces.
@@ -150,49 +138,92 @@ class PumpTester:
         if not self.validate_pump_index(pump_index) or not self.validate_amount(amount_oz):
             return False
         
-        try:
-            # Convert ounces to millimeters (negative for backward)
-            distance_mm = -amount_oz * constants.MM_PER_OZ
-            
-            # 1. Reset GRBL position
-            print("Resetting GRBL position")
-            self.grbl.reset_position()
-            
-            # 2. Enable the pump
-            print(f"Enabling pump {pump_index}")
-            self.pumps[pump_index].value(0)  # Low = enabled
-            
-            # 3. Send movement command to GRBL
-            print(f"Running backward {amount_oz} oz ({-distance_mm} mm) from pump {pump_index}")
-            if not self.grbl.move(distance_mm):
-                # If move command failed, disable pump and return False
-                print("Failed to send GRBL movement command")
-                self.pumps[pump_index].value(1)  # Disable pump
-                return False
-            
-            # 4. Wait for the move to complete
-            if not self.grbl.wait_for_completion():
-                # If move completion failed, disable pump and return False
-                print("Failed to complete GRBL movement")
-                self.pumps[pump_index].value(1)  # Disable pump
-                return False
-            
-            # 5. Disable the pump
-            print(f"Disabling pump {pump_index}")
-            self.pumps[pump_index].value(1)  # High = disabled
-            
-            # 6. Reset GRBL position
-            self.grbl.reset_position()
+        # Convert ounces to millimeters
+        distance_mm = oz_to_mm(amount_oz)
+        
+        print(f"Running backward {amount_oz} oz ({distance_mm} mm) from pump {pump_index}")
+        if not await self.controller.run_pump(pump_index, -distance_mm):
+            print(f"Pump {pump_index} backward test failed")
+            return False
+        
+        print(f"Pump {pump_index} backward test completed successfully")
+        return True
+    
+    async def test_stop_then_pour(self, pump_index, amount_oz):
+        """
+        Stop a pour mid-move as STOP does, then check that the next pour completes.
+        
+        After a stop GRBL is feed-held and must be soft-reset before the next move;
+        this checks that the recovery does not swallow that move.
+        
+        Args:
+            pump_index: The index of the pump to test.
+            amount_oz: The amount to dispense in fluid ounces for each pour.
             
-            print(f"Pump {pump_index} backward test completed successfully")
-            return True
+        Returns:
+            bool: True if the pour after the stop completed, False otherwise.
+        """
+        print(f"\n--- Testing Stop Then Pour on Pump {pump_index} ({amount_oz} oz) ---")
+        
+        # Validate parameters
+        if not self.validate_pump_index(pump_index) or not self.validate_amount(amount_oz):
+            return False
+        
+        distance_mm = oz_to_mm(amount_oz)
+        
+        # Start a pour and cancel it while the pump is moving, as STOP does
+        task = asyncio.create_task(self.controller.run_pump(pump_index, distance_mm))
+        await asyncio.sleep_ms(200)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        print("Pour stopped")
+        
+        # The next pour has to reach GRBL and finish rather than time out
+        if not await self.controller.run_pump(pump_index, distance_mm):
+            print(f"Pour after stop failed on pump {pump_index}")
+            return False
+        
+        print(f"Pump {pump_index} stop-then-pour test completed successfully")
+        return True
+    
+    async def test_cancelling_batch(self, pump_index, amount_oz):
+        """
+        Run a batch whose same-pump entries cancel out, followed by a real move.
+        
+        The first two entries run the pump forward and then backward by the same
+        distance, so they merge to 0 mm and must be skipped rather than sent as a
+        move that never completes. The last entry, on the next pump, must still run.
+        
+        Args:
+            pump_index: The index of the pump whose entries cancel out.
+            amount_oz: The amount in fluid ounces for each entry.
             
-        except Exception as e:
-            print(f"Error testing pump {pump_index}: {e}")
-            # Make sure pump is disabled in case of error
-            if pump_index >= 0 and pump_index < len(self.pumps):
-                self.pumps[pump_index].value(1)  # Disable pump
+        Returns:
+            bool: True if every entry in the batch completed, False otherwise.
+        """
+        print(f"\n--- Testing Cancelling Batch on Pump {pump_index} ({amount_oz} oz) ---")
+        
+        # Validate parameters
+        if not self.validate_pump_index(pump_index) or not self.validate_amount(amount_oz):
+            return False
+        
+        distance_mm = oz_to_mm(amount_oz)
+        next_index = (pump_index + 1) % self._n_pumps
+        
+        # Packed the same way Recipe stores its ingredients
+        pumps = array('B', (pump_index, pump_index, next_index))
+        distances = array('h', (distance_mm, -distance_mm, distance_mm))
+        
+        done = await self.controller.dispense_batch(pumps, distances)
+        if done != len(pumps):
+            print(f"Cancelling batch stopped after {done} of {len(pumps)} entries")
             return False
+        
+        print(f"Pump {pump_index} cancelling batch test completed successfully")
+        return True
 
 
 # Simple test script when run directly
@@ -213,10 +244,10 @@ if __name__ == "__main__":
             raise ValueError(f"Invalid pump index: {pump_index}")
             
         # Ask for direction
-        direction = input("Test direction (f=forward, b=backward): ").strip().lower()
+        direction = input("Test direction (f=forward, b=backward, s=stop then pour, c=cancelling batch): ").strip().lower()
         
         # Ask for amount
-        amount_oz = float(input(f"Enter amount to dispense (oz, {constants.MIN_PUMP_OZ}-{constants.MAX_PUMP_OZ}): ").strip())
+        amount_oz = float(input(f"Enter amount to dispense (oz, {MIN_PUMP_OZ}-{MAX_PUMP_OZ}): ").strip())
         
         # Validate amount
         if not tester.validate_amount(amount_oz):
@@ -224,11 +255,15 @@ if __name__ == "__main__":
             
         # Run the test
         if direction == 'f':
-            tester.test_pump(pump_index, amount_oz)
+            asyncio.run(tester.test_pump(pump_index, amount_oz))
         elif direction == 'b':
-            tester.test_pump_backward(pump_index, amount_oz)
+            asyncio.run(tester.test_pump_backward(pump_index, amount_oz))
+        elif direction == 's':
+            asyncio.run(tester.test_stop_then_pour(pump_index, amount_oz))
+        elif direction == 'c':
+            asyncio.run(tester.test_cancelling_batch(pump_index, amount_oz))
         else:
-            print("Invalid direction. Use 'f' for forward or 'b' for backward")
+            print("Invalid direction. Use 'f' for forward, 'b' for backward, 's' for stop then pour or 'c' for cancelling batch")
     
     except KeyboardInterrupt:
         print("\nTest interrupted by user")
@@ -237,7 +272,5 @@ if __name__ == "__main__":
     
     finally:
         # Clean up: make sure all pumps are disabled
-        for i, pump in enumerate(tester.pumps):
-            pump.value(1)  # Disable all pumps
-            print(f"Ensured pump {i} is disabled")
+        tester.disable_all()
         print("Test complete, all pumps disabled")
\ No newline at end of file
@@ -8,7 +8,7 @@ Classes:
     Recipe: Stores and manages a drink recipe
 
 The Recipe class is responsible for:
-    - Storing a recipe ID and list of ingredients
+    - Storing a recipe ID and its ingredients
     - Adding ingredients to the recipe
     - Validating the recipe format
     - Executing the recipe using the pump controller
@@ -27,63 +27,133 @@ Usage:
     recipe.add_ingredient(pump_index=0, amount_oz=1.5)
     recipe.add_ingredient(pump_index=3, amount_oz=1.1)
     
-    # Execute the recipe
-    recipe.execute(pump_controller)
+    # Execute the recipe (from an asyncio task)
+    await recipe.execute(pump_controller)
 
 The Recipe class handles validation of ingredient specifications, ensuring that
-pump indices are valid and amounts are within reasonable ranges.
+pump indices are valid and amounts are within reasonable ranges. Ingredients are stored
+as two parallel arrays, pump indices and signed distances in millimeters, so a recipe
+holds no per-ingredient tuples; each amount is converted to millimeters once, when it is
+added, and a backward ingredient is stored as a negative distance.
+ingredient_count() gives the number of ingredients.
 
-The execute method runs through each ingredient in sequence, using the pump controller
-to dispense the specified amounts.
+The execute method is a coroutine that runs through each ingredient in sequence, using
+the pump controller to dispense the specified amounts; cancelling it stops the pumps.
 
 This module depends on:
     - config.py for validation constants
     - pump_controller.py for dispensing operations
 """
 
-from config import constants
+import asyncio
+from array import array
+from micropython import const
+from config import NUM_PUMPS, MIN_PUMP_OZ, MAX_PUMP_OZ, OZ_SCALE
+from pump_controller import hundredths_to_mm
+from grbl_interface import GRBLError
+
+# Set to 1 to print per-ingredient progress; when 0 the compiler drops those prints
+_DEBUG = const(0)
+
+# Set to 0 to also drop the prints for invalid ingredients and failed pours
+_LOG_ERRORS = const(1)
+
+# Amount limits in hundredths of an ounce, for validating parsed amounts
+_MIN_HUNDREDTHS = int(MIN_PUMP_OZ * OZ_SCALE + 0.5)
+_MAX_HUNDREDTHS = int(MAX_PUMP_OZ * OZ_SCALE + 0.5)
 
 class Recipe:
     """Stores and manages a drink recipe."""
     
-    def __init__(self, id):
+    def __init__(self, id, pump_controller=None):
         """
         Initialize a new recipe.
         
         Args:
             id: A unique identifier for the recipe.
+            pump_controller: The PumpController the recipe will run on; pump indices
+                are checked against its pumps. Defaults to NUM_PUMPS from config.
         """
         self.id = id
-        self.ingredients = []
+        self.num_pumps = len(pump_controller.pumps) if pump_controller else NUM_PUMPS
+        
+        # Ingredients as parallel arrays: pump index and signed distance in millimeters
+        self._pumps = array('B')
+        self._dist_mm = array('h')
+    
+    def ingredient_count(self):
+        """
+        Get the number of ingredients in the recipe.
+        
+        Returns:
+            int: The number of ingredients.
+        """
+        return len(self._pumps)
     
-    def add_ingredient(self, pump_index, amount_oz):
+    def add_ingredient(self, pump_index, amount_oz, direction="FORWARD"):
         """
         Add an ingredient to the recipe.
         
         Args:
             pump_index: The index of the pump to use for this ingredient.
             amount_oz: The amount to dispense in fluid ounces.
+            direction: "FORWARD" to dispense, or "BACKWARD" to run the pump in
+                reverse by the same amount.
             
         Returns:
             bool: True if the ingredient was added successfully, False otherwise.
             
         Raises:
-            ValueError: If the pump index or amount is invalid.
+            ValueError: If the pump index, amount or direction is invalid.
+        """
+        return self.add_ingredient_hundredths(pump_index, int(amount_oz * OZ_SCALE + 0.5),
+                                              direction)
+    
+    def add_ingredient_hundredths(self, pump_index, amount, direction="FORWARD"):
+        """
+        Add an ingredient whose amount is already in hundredths of an ounce.
+        
+        This is the integer-only path used for parsed serial commands.
+        
+        Args:
+            pump_index: The index of the pump to use for this ingredient.
+            amount: The amount to dispense in hundredths of an ounce.
+            direction: "FORWARD" to dispense, or "BACKWARD" to run the pump in
+                reverse by the same amount.
+            
+        Returns:
+            bool: True if the ingredient was added successfully.
+            
+        Raises:
+            ValueError: If the pump index, amount or direction is invalid.
         """
         # Validate pump index
-        if pump_index < 0 or pump_index >= constants.NUM_PUMPS:
-            error_msg = f"Invalid pump index: {pump_index}. Must be between 0 and {constants.NUM_PUMPS - 1}"
-            print(error_msg)
+        if pump_index < 0 or pump_index >= self.num_pumps:
+            error_msg = f"Invalid pump index: {pump_index}. Must be between 0 and {self.num_pumps - 1}"
+            if _LOG_ERRORS:
+                print(error_msg)
             raise ValueError(error_msg)
         
         # Validate amount
-        if amount_oz < constants.MIN_PUMP_OZ or amount_oz > constants.MAX_PUMP_OZ:
-            error_msg = f"Invalid amount: {amount_oz} oz. Must be between {constants.MIN_PUMP_OZ} and {constants.MAX_PUMP_OZ} oz"
-            print(error_msg)
+        if amount < _MIN_HUNDREDTHS or amount > _MAX_HUNDREDTHS:
+            error_msg = f"Invalid amount: {amount / OZ_SCALE} oz. Must be between {MIN_PUMP_OZ} and {MAX_PUMP_OZ} oz"
+            if _LOG_ERRORS:
+                print(error_msg)
             raise ValueError(error_msg)
         
-        # Add the ingredient to the recipe
-        self.ingredients.append((pump_index, amount_oz))
+        # Convert the distance once, up front, with the direction as its sign
+        distance_mm = hundredths_to_mm(amount)
+        if direction == "BACKWARD":
+            distance_mm = -distance_mm
+        elif direction != "FORWARD":
+            error_msg = f"Invalid direction: {direction}. Must be FORWARD or BACKWARD"
+            if _LOG_ERRORS:
+                print(error_msg)
+            raise ValueError(error_msg)
+        
+        # Add the ingredient
+        self._pumps.append(pump_index)
+        self._dist_mm.append(distance_mm)
         return True
     
     def add_ingredients(self, ingredients):
@@ -101,55 +171,88 @@ class Recipe:
                 self.add_ingredient(pump_index, amount_oz)
             return True
         except Exception as e:
-            print(f"Error adding ingredients: {e}")
+            if _LOG_ERRORS:
+                print("Error adding ingredients:", e)
             return False
     
-    def execute(self, pump_controller):
+    async def execute(self, pump_controller):
         """
         Execute the recipe by dispensing each ingredient in sequence.
         
+        The ingredients go to the pump controller as one batch, so GRBL's position
+        is reset once per recipe rather than after every ingredient.
+        
         Args:
             pump_controller: A PumpController instance to use for dispensing.
             
         Returns:
             bool: True if the recipe was executed successfully, False otherwise.
         """
-        print(f"Executing recipe {self.id} with {len(self.ingredients)} ingredients")
+        count = len(self._pumps)
         
-        for index, (pump_index, amount_oz) in enumerate(self.ingredients):
-            print(f"Dispensing ingredient {index + 1}/{len(self.ingredients)}: Pump {pump_index}, {amount_oz} oz")
-            
-            # Dispense the ingredient
-            success = pump_controller.dispense(pump_index, amount_oz)
+        if _DEBUG:
+            print("Executing recipe", self.id, "with", count, "ingredients")
+        
+        # One guard for the whole pour rather than one per ingredient
+        try:
+            # Dispense every ingredient as one batch; they were validated and
+            # converted when added
+            done = await pump_controller.dispense_batch(self._pumps, self._dist_mm)
             
             # If dispensing failed, stop execution
-            if not success:
-                print(f"Failed to dispense ingredient {index + 1}")
+            if done < count:
+                if _LOG_ERRORS:
+                    print("Failed to dispense ingredient", done + 1)
                 return False
+            
+        except asyncio.CancelledError:
+            # STOP cancelled the pour: halt the pumps and GRBL right away
+            pump_controller.stop()
+            raise
+            
+        except GRBLError:
+            # Communication failure: leave recovery to the caller with the pumps off
+            pump_controller.disable_all()
+            raise
+            
+        except Exception as e:
+            if _LOG_ERRORS:
+                print("Error executing recipe", self.id, e)
+            pump_controller.disable_all()
+            return False
         
-        print(f"Recipe {self.id} executed successfully")
+        if _DEBUG:
+            print("Recipe", self.id, "executed successfully")
         return True
     
-    def from_command(command):
+    def from_command(command, pump_controller=None):
         """
         Create a Recipe object from a parsed command.
         
+        Every ingredient is validated here, once, so execute() can dispense
+        without checking them again. The ingredients are copied out of the
+        command, so the parser may reuse it for the next recipe.
+        
         Args:
-            command: A parsed command object with 'id' and 'ingredients' fields.
+            command: A parsed command object with 'id', parallel 'pumps' and
+                'amounts' (hundredths of an ounce) arrays, and 'count' fields.
+            pump_controller: The PumpController the recipe will run on (optional).
             
         Returns:
             Recipe: A Recipe object if created successfully, None otherwise.
         """
         try:
             # Create a new recipe with the specified ID
-            recipe = Recipe(command.get('id'))
+            recipe = Recipe(command.get('id'), pump_controller)
             
             # Add ingredients from the command
-            ingredients = command.get('ingredients', [])
-            if recipe.add_ingredients(ingredients):
-                return recipe
-            return None
+            pumps = command['pumps']
+            amounts = command['amounts']
+            for i in range(command['count']):
+                recipe.add_ingredient_hundredths(pumps[i], amounts[i])
+            return recipe
             
         except Exception as e:
-            print(f"Error creating recipe from command: {e}")
+            if _LOG_ERRORS:
+                print("Error creating recipe from command:", e)
             return None
\ No newline at end of file
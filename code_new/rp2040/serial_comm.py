@@ -12,6 +12,7 @@ Classes:
 The SerialCommunication class is responsible for:
     - Initializing the serial connection to the Raspberry Pi
     - Checking for incoming commands in a non-blocking way
+    - Awaiting the next command from an asyncio task
     - Parsing raw serial data into structured command objects
     - Sending formatted status messages back to the Raspberry Pi
     - Parsing recipe commands into a usable format
@@ -23,7 +24,7 @@ Usage:
     # Initialize the serial connection
     serial = SerialCommunication()
     
-    # Check for incoming commands
+    # Check for incoming commands (or: command = await serial.next_command())
     command = serial.check_for_command()
     if command:
         command_type = command.get('type')
@@ -43,6 +44,15 @@ Command Format:
     - Control: START_POUR, STOP
     - Maintenance: MAINTENANCE:ACTION, MAINTENANCE:PUMP:NUM:DIRECTION:AMOUNT
 
+Binary Frames:
+    Recipes and control commands may also be sent as binary frames, which need
+    no text parsing:
+        [0xAA][LEN][TYPE][payload: LEN bytes][CRC-8 of TYPE and payload]
+    TYPE is 0x01 RECIPE, 0x02 START_POUR or 0x03 STOP. A RECIPE payload is the
+    recipe ID as a little-endian u16 followed by one (u8 pump, u16 hundredths of
+    an ounce) entry per ingredient. CRC-8 uses polynomial 0x07, initial value 0.
+    Text commands never start with 0xAA, so both forms can share the line.
+
 Response Format:
     - Status: READY, POURING, COMPLETE
     - Error: ERROR:message
@@ -55,8 +65,137 @@ This module depends on:
 """
 
 import time
+import asyncio
+import micropython
+from array import array
 from machine import Pin, UART
-from config import pins, constants, commands
+from micropython import const
+from config import PI_UART_TX, PI_UART_RX, PI_UART_RTS, PI_BAUDRATE, PI_RXBUF, commands, OZ_SCALE
+
+# Set to 1 to trace every command and status message; when 0 the compiler drops those prints
+_DEBUG = const(0)
+
+# Set to 0 to also drop the prints for malformed or unknown commands
+_LOG_ERRORS = const(1)
+
+# Size of the receive buffer for polled commands; longer lines are discarded
+_RX_BUF_SIZE = const(256)
+
+# Most ingredients a single RECIPE command may carry
+_MAX_INGREDIENTS = const(16)
+
+# Binary frame start byte and types (see Binary Frames above)
+_FRAME_START = const(0xAA)
+_FRAME_RECIPE = const(0x01)
+_FRAME_START_POUR = const(0x02)
+_FRAME_STOP = const(0x03)
+
+# Largest frame payload: a recipe ID plus 3 bytes per ingredient
+_MAX_FRAME_PAYLOAD = const(2 + 3 * _MAX_INGREDIENTS)
+
+# Byte that ends a text command
+_NEWLINE = const(0x0A)
+
+# Maintenance keywords, encoded once so payloads are matched without decoding
+_PRIME_ALL = commands.PRIME_ALL.encode()
+_CLEAN_ALL = commands.CLEAN_ALL.encode()
+_PUMP_PREFIX = (commands.PUMP + ':').encode()
+
+@micropython.native
+def _parse_uint(buf, start, end):
+    """
+    Parse an unsigned decimal integer such as b'3' in place.
+    
+    Args:
+        buf: The bytes holding the number.
+        start: Index of the first digit.
+        end: Index just past the last digit.
+        
+    Returns:
+        int: The parsed value.
+        
+    Raises:
+        ValueError: If the text is empty or contains a non-digit.
+    """
+    if start >= end:
+        raise ValueError("invalid number")
+    value = 0
+    for i in range(start, end):
+        d = buf[i] - 0x30
+        if d < 0 or d > 9:
+            raise ValueError("invalid number")
+        value = value * 10 + d
+    return value
+
+@micropython.native
+def _parse_hundredths(buf, start, end):
+    """
+    Parse a decimal amount such as b'1.5' into hundredths of an ounce.
+    
+    Only integer arithmetic is used, with no float() and no copy of the digits.
+    Digits past the hundredths place round the result half up.
+    
+    Args:
+        buf: The bytes holding the number.
+        start: Index of the first character of the number.
+        end: Index just past the last character.
+        
+    Returns:
+        int: The amount in units of 1/OZ_SCALE ounce.
+        
+    Raises:
+        ValueError: If the text is not an unsigned decimal number.
+    """
+    whole = 0
+    frac = 0
+    scale = OZ_SCALE
+    digits = 0
+    point = False
+    rounded = False
+    for i in range(start, end):
+        c = buf[i]
+        if c == 0x2E and not point:  # '.'
+            point = True
+            continue
+        d = c - 0x30
+        if d < 0 or d > 9:
+            raise ValueError("invalid amount")
+        digits += 1
+        if not point:
+            whole = whole * 10 + d
+        elif scale > 1:
+            scale //= 10
+            frac += d * scale
+        elif not rounded:
+            rounded = True
+            if d >= 5:
+                frac += 1
+    if not digits:
+        raise ValueError("invalid amount")
+    return whole * OZ_SCALE + frac
+
+@micropython.native
+def _crc8(buf, start, end):
+    """
+    Compute the CRC-8 (polynomial 0x07, initial value 0) of buf[start:end].
+    
+    Args:
+        buf: The bytes to check.
+        start: Index of the first byte.
+        end: Index just past the last byte.
+        
+    Returns:
+        int: The CRC, 0-255.
+    """
+    crc = 0
+    for i in range(start, end):
+        crc ^= buf[i]
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ 0x07) & 0xff
+            else:
+                crc = (crc << 1) & 0xff
+    return crc
 
 class SerialCommunication:
     """Manages serial communication with the Raspberry Pi."""
@@ -64,14 +203,59 @@ class SerialCommunication:
     def __init__(self):
         """Initialize the serial connection to the Raspberry Pi."""
         # Initialize UART for Pi communication
+        # RTS flow control makes the Pi pause rather than overrun the receiver;
+        # CTS is not used because every UART1 CTS pin is taken by a pump or sensor.
+        # Everything is set in the constructor, since a later init() call would
+        # re-initialise the UART and its flow control
         self.uart = UART(1,
-                         baudrate=constants.PI_BAUDRATE,
-                         tx=Pin(pins.PI_UART_TX),
-                         rx=Pin(pins.PI_UART_RX))
-        self.uart.init(bits=8, parity=None, stop=1)
+                         baudrate=PI_BAUDRATE,
+                         bits=8, parity=None, stop=1,
+                         tx=Pin(PI_UART_TX),
+                         rx=Pin(PI_UART_RX),
+                         rts=Pin(PI_UART_RTS),
+                         flow=UART.RTS,
+                         rxbuf=PI_RXBUF)
+        
+        # Bound UART methods, resolved once for the send and receive paths
+        self._write = self.uart.write
+        self._readinto = self.uart.readinto
+        
+        # Set from the UART interrupt when a burst of data has arrived, so tasks
+        # can await commands instead of polling
+        self._rx_flag = asyncio.ThreadSafeFlag()
+        self.uart.irq(handler=self._rx_isr, trigger=UART.IRQ_RXIDLE, hard=True)
         
-        # Buffer for incoming data
-        self.buffer = ""
+        # Preallocated buffer for incoming data, filled in place by readinto()
+        self._buf = bytearray(_RX_BUF_SIZE)
+        self._mv = memoryview(self._buf)
+        self._len = 0
+        
+        # Parsed recipe, reused for every RECIPE command: ingredients are stored
+        # as parallel pump/amount arrays, with 'count' entries in use
+        self._recipe = {
+            'type': commands.RECIPE,
+            'id': None,
+            'pumps': array('B', bytes(_MAX_INGREDIENTS)),
+            'amounts': array('H', bytes(2 * _MAX_INGREDIENTS)),
+            'count': 0
+        }
+        
+        # Complete lines for the argument-free statuses, encoded once so the
+        # common replies are written without building a string
+        self._status_lines = {
+            commands.READY: b'READY\n',
+            commands.POURING: b'POURING\n',
+            commands.COMPLETE: b'COMPLETE\n',
+        }
+        
+        # Command type (bytes before the first ':') -> parser for the payload
+        # after it; the payload is None for commands without a ':'
+        self._dispatch = {
+            commands.START_POUR.encode(): self._parse_start_pour,
+            commands.STOP.encode(): self._parse_stop,
+            commands.RECIPE.encode(): self.parse_recipe_command,
+            commands.MAINTENANCE.encode(): self.parse_maintenance_command,
+        }
     
     def send_message(self, message):
         """
@@ -83,23 +267,39 @@ class SerialCommunication:
         Returns:
             bool: True if the message was sent successfully, False otherwise.
         """
+        # Add newline to end of message if not present
+        if not message.endswith('\n'):
+            message += '\n'
+            
+        # Send the message as bytes
+        return self._send_line(message.encode())
+    
+    def _send_line(self, line):
+        """
+        Write an encoded, newline-terminated line to the Raspberry Pi.
+        
+        Args:
+            line: The bytes to send.
+            
+        Returns:
+            bool: True if the line was sent successfully, False otherwise.
+        """
         try:
-            # Add newline to end of message if not present
-            if not message.endswith('\n'):
-                message += '\n'
-                
-            # Send the message as bytes
-            self.uart.write(message.encode())
+            self._write(line)
             return True
             
         except Exception as e:
-            print(f"Error sending message: {e}")
+            if _LOG_ERRORS:
+                print("Error sending message:", e)
             return False
     
     def send_status(self, status_type, message=None):
         """
         Send a status message to the Raspberry Pi.
         
+        READY, POURING and COMPLETE without a message are written from
+        preencoded lines; other statuses are formatted as "TYPE:message".
+        
         Args:
             status_type: The type of status message (e.g., READY, POURING, etc.).
             message: An optional message to include with the status.
@@ -110,185 +310,404 @@ class SerialCommunication:
         if message:
             status = f"{status_type}:{message}"
         else:
+            # Common case: write the preencoded line directly
+            line = self._status_lines.get(status_type)
+            if line is not None:
+                if _DEBUG:
+                    print("Sending status:", status_type)
+                return self._send_line(line)
             status = status_type
             
-        print(f"Sending status: {status}")
+        if _DEBUG:
+            print("Sending status:", status)
         return self.send_message(status)
     
+    @micropython.native
     def check_for_command(self):
         """
         Check for incoming commands from the Raspberry Pi.
         
-        This method is non-blocking and should be called regularly in the main loop.
+        This method is non-blocking and should be called regularly in the main loop
+        (or use next_command()). Incoming bytes are read straight into a
+        preallocated buffer; a binary frame is parsed from that buffer in place,
+        and a text command once its whole line has arrived. Malformed commands
+        are skipped.
         
         Returns:
             dict or None: A parsed command object if a complete command is available,
                           None otherwise.
         """
-        # Check if data is available
-        if self.uart.any():
-            # Read available data
-            data = self.uart.read()
-            if data:
-                # Decode and add to buffer
-                try:
-                    text = data.decode('utf-8')
-                    self.buffer += text
-                except UnicodeError:
-                    print("Error decoding serial data")
-        
-        # Check for complete commands in buffer
-        if '\n' in self.buffer:
-            # Split the buffer at the first newline
-            command_str, self.buffer = self.buffer.split('\n', 1)
+        buf = self._buf
+        mv = self._mv
+        
+        # Drain everything the UART has queued into the free end of the buffer,
+        # so the hardware FIFO cannot overrun between calls
+        readinto = self._readinto
+        length = self._len
+        while length < _RX_BUF_SIZE:
+            n = readinto(mv[length:])
+            if not n:
+                break
+            length += n
+        self._len = length
+        
+        # Parse buffered commands until one is valid or none is complete, so a
+        # malformed line does not hold up the ones behind it
+        while length:
+            # Binary frame: wait for all of it, then parse it straight from the buffer
+            if buf[0] == _FRAME_START:
+                if length < 2:
+                    return None
+                if buf[1] > _MAX_FRAME_PAYLOAD:
+                    # Not a frame we could hold; drop the start byte and resync
+                    if _LOG_ERRORS:
+                        print("Invalid frame length, discarding")
+                    self._consume(1)
+                    length = self._len
+                    continue
+                size = buf[1] + 4
+                if length < size:
+                    return None
+                command = self._parse_frame(buf, size)
+                self._consume(size)
+                length = self._len
+                if command:
+                    return command
+                continue
             
-            # Strip whitespace
-            command_str = command_str.strip()
+            # Check for a complete command in the buffer; bytearray has no
+            # find() in MicroPython, so scan for the newline by index
+            nl = 0
+            while nl < length and buf[nl] != _NEWLINE:
+                nl += 1
+            if nl == length:
+                if length == _RX_BUF_SIZE:
+                    # A full buffer with no newline can never complete; drop it
+                    if _LOG_ERRORS:
+                        print("Serial buffer overflow, discarding data")
+                    self._len = 0
+                return None
+            
+            # Trim surrounding whitespace (such as a '\r') by index, so the
+            # line is copied out of the buffer once
+            start = 0
+            end = nl
+            while end > start and buf[end - 1] <= 32:
+                end -= 1
+            while start < end and buf[start] <= 32:
+                start += 1
+            
+            # Take the line, then move any following bytes to the front
+            line = bytes(mv[start:end]) if end > start else None
+            self._consume(nl + 1)
+            length = self._len
             
             # If there's a command, parse it
-            if command_str:
-                return self.parse_command(command_str)
+            if line:
+                command = self.parse_command(line)
+                if command:
+                    return command
         
         # No complete command available
         return None
     
-    def parse_command(self, command_str):
+    def _rx_isr(self, uart):
+        """
+        Wake the task waiting in next_command() when received data goes idle.
+        
+        Runs as a hard interrupt: it only sets a flag, and the data is read from
+        task context by check_for_command(), which owns the receive buffer.
+        
+        Args:
+            uart: The UART that raised the interrupt.
+        """
+        self._rx_flag.set()
+    
+    def _consume(self, n):
         """
-        Parse a command string into a structured command object.
+        Remove the first n bytes of the receive buffer, keeping what follows.
         
         Args:
-            command_str: The command string to parse.
+            n: The number of bytes to remove.
+        """
+        rest = self._len - n
+        self._buf[:rest] = self._mv[n:self._len]
+        self._len = rest
+    
+    async def next_command(self):
+        """
+        Wait for the next command from the Raspberry Pi.
+        
+        Unlike check_for_command, this coroutine suspends until a complete line
+        or binary frame has arrived, so the event loop can run other tasks in
+        the meantime. It is woken by the UART receive-idle interrupt and then
+        reads through check_for_command(), so both share one receive buffer.
+        
+        Returns:
+            dict: A parsed command object. Lines that cannot be parsed are skipped.
+        """
+        while True:
+            command = self.check_for_command()
+            if command:
+                return command
+            
+            # Sleep until the UART interrupt reports more data, unless some is
+            # still queued because the receive buffer filled up
+            if not self.uart.any():
+                await self._rx_flag.wait()
+    
+    @micropython.native
+    def parse_command(self, command):
+        """
+        Parse a command line into a structured command object.
+        
+        The command type is looked up in a dispatch table, so the line stays in
+        bytes and only the parser for a known command looks at the payload.
+        
+        Args:
+            command: The command line as bytes, without the newline.
             
         Returns:
             dict or None: A parsed command object if parsing is successful,
                           None otherwise.
         """
-        try:
-            print(f"Parsing command: {command_str}")
-            
-            # Handle simple commands
-            if command_str == commands.START_POUR:
-                return {'type': commands.START_POUR}
-            elif command_str == commands.STOP:
-                return {'type': commands.STOP}
-            
-            # Handle complex commands (with ':' separator)
-            if ':' in command_str:
-                parts = command_str.split(':', 1)
-                command_type = parts[0]
-                
-                if command_type == commands.RECIPE:
-                    return self.parse_recipe_command(parts[1])
-                elif command_type == commands.MAINTENANCE:
-                    return self.parse_maintenance_command(parts[1])
-                else:
-                    print(f"Unknown command type: {command_type}")
-            else:
-                print(f"Malformed command: {command_str}")
+        if _DEBUG:
+            print("Parsing command:", command)
+        
+        # Split off the command type at the first ':'
+        colon = command.find(b':')
+        if colon < 0:
+            command_type = command
+            payload = None
+        else:
+            command_type = command[:colon]
+            payload = command[colon + 1:]
+        
+        parser = self._dispatch.get(command_type)
+        if parser:
+            return parser(payload)
+        
+        if _LOG_ERRORS:
+            print("Unknown command type:", command_type)
+        return None
+    
+    def _parse_frame(self, frame, size):
+        """
+        Parse a binary frame into a structured command object.
+        
+        Args:
+            frame: Bytes holding a complete frame, start byte first.
+            size: The length of the frame, including the start byte and CRC.
             
+        Returns:
+            dict or None: A parsed command object, or None if the CRC does not
+                          match or the frame type is unknown.
+        """
+        if _crc8(frame, 2, size - 1) != frame[size - 1]:
+            if _LOG_ERRORS:
+                print("Frame CRC mismatch, discarding")
             return None
+        
+        frame_type = frame[2]
+        if frame_type == _FRAME_RECIPE:
+            return self._parse_recipe_frame(frame, 3, size - 1)
+        if frame_type == _FRAME_START_POUR:
+            return {'type': commands.START_POUR}
+        if frame_type == _FRAME_STOP:
+            return {'type': commands.STOP}
+        
+        if _LOG_ERRORS:
+            print("Unknown frame type:", frame_type)
+        return None
+    
+    @micropython.native
+    def _parse_recipe_frame(self, frame, start, end):
+        """
+        Unpack a binary recipe payload into the reused recipe dict.
+        
+        Fields are read byte by byte straight into the preallocated arrays,
+        so there is no text, no float and no per-ingredient allocation.
+        
+        Args:
+            frame: Bytes holding the payload.
+            start: Index of the first payload byte.
+            end: Index just past the last payload byte.
             
-        except Exception as e:
-            print(f"Error parsing command: {e}")
+        Returns:
+            dict or None: The parsed recipe (see parse_recipe_command), or None
+                          if the payload is malformed.
+        """
+        n = (end - start - 2) // 3
+        if n < 0 or start + 2 + 3 * n != end:
+            if _LOG_ERRORS:
+                print("Malformed recipe frame")
             return None
+        
+        recipe = self._recipe
+        pumps = recipe['pumps']
+        amounts = recipe['amounts']
+        
+        recipe['id'] = str(frame[start] | frame[start + 1] << 8)
+        i = start + 2
+        for k in range(n):
+            pumps[k] = frame[i]
+            amounts[k] = frame[i + 1] | frame[i + 2] << 8
+            i += 3
+        recipe['count'] = n
+        return recipe
     
-    def parse_recipe_command(self, recipe_str):
+    def _parse_start_pour(self, payload):
+        """Parse a START_POUR command; it takes no payload."""
+        return {'type': commands.START_POUR}
+    
+    def _parse_stop(self, payload):
+        """Parse a STOP command; it takes no payload."""
+        return {'type': commands.STOP}
+    
+    @micropython.native
+    def parse_recipe_command(self, recipe_buf):
         """
-        Parse a recipe command string into a structured recipe object.
+        Parse a recipe command into a structured recipe object.
         
         Format: RECIPE:ID,PUMP:AMOUNT,PUMP:AMOUNT,...
         
+        The payload is scanned once, left to right, locating each comma and colon
+        with find() instead of splitting it into intermediate lists and strings.
+        Pump numbers and amounts (as integer hundredths of an ounce) are parsed
+        in place, so no ingredient field is copied out of the payload.
+        
+        The result is written into a dict owned by this object: 'id', parallel
+        'pumps' and 'amounts' (hundredths of an ounce) arrays, and 'count', the
+        number of ingredients in them. The same dict is returned for every
+        recipe, so callers must copy what they need (Recipe.from_command does)
+        before the next one arrives.
+        
+        There is no blanket exception handler: the payload is checked up front
+        and only the conversion of each field is guarded against ValueError.
+        
         Args:
-            recipe_str: The recipe string to parse.
+            recipe_buf: The recipe payload (the part after 'RECIPE:') as bytes.
             
         Returns:
             dict or None: A parsed recipe object if parsing is successful,
                           None otherwise.
         """
+        # A recipe needs an ID and at least one ingredient after it
+        comma = recipe_buf.find(b',') if recipe_buf is not None else -1
+        if comma < 0:
+            if _LOG_ERRORS:
+                print("Malformed command: RECIPE requires an ID and ingredients")
+            return None
+        
+        mv = memoryview(recipe_buf)
+        end = len(recipe_buf)
+        
+        # The first field is the recipe ID
         try:
-            # Split the recipe string by commas
-            parts = recipe_str.split(',')
-            
-            # The first part should be the recipe ID
-            recipe_id = parts[0]
-            
-            # The remaining parts are pump:amount pairs
-            ingredients = []
-            for i in range(1, len(parts)):
-                if ':' in parts[i]:
-                    pump_str, amount_str = parts[i].split(':', 1)
-                    try:
-                        pump_index = int(pump_str)
-                        amount_oz = float(amount_str)
-                        ingredients.append((pump_index, amount_oz))
-                    except ValueError:
-                        print(f"Invalid pump or amount: {parts[i]}")
-                else:
-                    print(f"Malformed ingredient: {parts[i]}")
-            
-            return {
-                'type': commands.RECIPE,
-                'id': recipe_id,
-                'ingredients': ingredients
-            }
-            
-        except Exception as e:
-            print(f"Error parsing recipe command: {e}")
+            recipe_id = bytes(mv[:comma]).decode()
+        except ValueError:
+            if _LOG_ERRORS:
+                print("Invalid recipe ID")
             return None
+        
+        # The remaining fields are pump:amount pairs, written in place into
+        # the preallocated arrays
+        recipe = self._recipe
+        pumps = recipe['pumps']
+        amounts = recipe['amounts']
+        n = 0
+        start = comma + 1
+        while start < end:
+            comma = recipe_buf.find(b',', start)
+            if comma < 0:
+                comma = end
+            colon = recipe_buf.find(b':', start, comma)
+            if n == _MAX_INGREDIENTS:
+                if _LOG_ERRORS:
+                    print("Too many ingredients, max", _MAX_INGREDIENTS)
+                return None
+            if colon >= 0:
+                try:
+                    pump_index = _parse_uint(recipe_buf, start, colon)
+                    amount = _parse_hundredths(recipe_buf, colon + 1, comma)
+                    # Out-of-range values would wrap when stored in the arrays
+                    if not 0 <= pump_index <= 0xff or amount > 0xffff:
+                        raise ValueError("out of range")
+                    pumps[n] = pump_index
+                    amounts[n] = amount
+                    n += 1
+                except ValueError:
+                    if _LOG_ERRORS:
+                        print("Invalid pump or amount:", bytes(mv[start:comma]))
+            else:
+                if _LOG_ERRORS:
+                    print("Malformed ingredient:", bytes(mv[start:comma]))
+            start = comma + 1
+        
+        recipe['id'] = recipe_id
+        recipe['count'] = n
+        return recipe
     
-    def parse_maintenance_command(self, maintenance_str):
+    def parse_maintenance_command(self, maintenance_buf):
         """
-        Parse a maintenance command string into a structured maintenance object.
+        Parse a maintenance command into a structured maintenance object.
         
         Formats:
             - MAINTENANCE:ACTION
             - MAINTENANCE:PUMP:NUM:DIRECTION:AMOUNT
         
         Args:
-            maintenance_str: The maintenance string to parse.
+            maintenance_buf: The maintenance payload (the part after
+                'MAINTENANCE:') as bytes.
             
         Returns:
             dict or None: A parsed maintenance object if parsing is successful,
                           None otherwise.
         """
-        try:
-            # Check for simple maintenance actions
-            if maintenance_str == commands.PRIME_ALL:
-                return {
-                    'type': commands.MAINTENANCE,
-                    'action': commands.PRIME_ALL
-                }
-            elif maintenance_str == commands.CLEAN_ALL:
-                return {
-                    'type': commands.MAINTENANCE,
-                    'action': commands.CLEAN_ALL
-                }
-            
-            # Check for pump-specific maintenance actions
-            if maintenance_str.startswith(commands.PUMP + ':'):
-                # Format: PUMP:NUM:DIRECTION:AMOUNT
-                parts = maintenance_str.split(':')
-                if len(parts) == 4:
-                    try:
-                        pump_index = int(parts[1])
-                        direction = parts[2]  # FORWARD or BACKWARD
-                        amount = float(parts[3])
-                        
-                        return {
-                            'type': commands.MAINTENANCE,
-                            'action': commands.PUMP,
-                            'pump_index': pump_index,
-                            'direction': direction,
-                            'amount': amount
-                        }
-                    except ValueError:
-                        print(f"Invalid pump index or amount: {maintenance_str}")
-                else:
-                    print(f"Malformed pump maintenance command: {maintenance_str}")
-            
-            print(f"Unknown maintenance command: {maintenance_str}")
+        if maintenance_buf is None:
+            if _LOG_ERRORS:
+                print("Malformed command: MAINTENANCE requires a payload")
             return None
-            
-        except Exception as e:
-            print(f"Error parsing maintenance command: {e}")
-            return None
\ No newline at end of file
+        
+        # Check for simple maintenance actions
+        if maintenance_buf == _PRIME_ALL:
+            return {
+                'type': commands.MAINTENANCE,
+                'action': commands.PRIME_ALL
+            }
+        elif maintenance_buf == _CLEAN_ALL:
+            return {
+                'type': commands.MAINTENANCE,
+                'action': commands.CLEAN_ALL
+            }
+        
+        # Check for pump-specific maintenance actions
+        if maintenance_buf.startswith(_PUMP_PREFIX):
+            # Format: PUMP:NUM:DIRECTION:AMOUNT; find the three separators and
+            # take each field by position instead of splitting
+            c1 = len(_PUMP_PREFIX) - 1
+            c2 = maintenance_buf.find(b':', c1 + 1)
+            c3 = maintenance_buf.find(b':', c2 + 1) if c2 > 0 else -1
+            if c3 > 0 and maintenance_buf.find(b':', c3 + 1) < 0:
+                try:
+                    pump_index = _parse_uint(maintenance_buf, c1 + 1, c2)
+                    direction = maintenance_buf[c2 + 1:c3].decode()  # FORWARD or BACKWARD
+                    amount = float(maintenance_buf[c3 + 1:])
+                    
+                    return {
+                        'type': commands.MAINTENANCE,
+                        'action': commands.PUMP,
+                        'pump_index': pump_index,
+                        'direction': direction,
+                        'amount': amount
+                    }
+                except ValueError:
+                    if _LOG_ERRORS:
+                        print("Invalid pump index or amount:", maintenance_buf)
+            else:
+                if _LOG_ERRORS:
+                    print("Malformed pump maintenance command:", maintenance_buf)
+        
+        if _LOG_ERRORS:
+            print("Unknown maintenance command:", maintenance_buf)
+        return None
\ No newline at end of file
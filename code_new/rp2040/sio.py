@@ -0,0 +1,84 @@
+"""
+sio.py - RP2040 SIO GPIO Register Access for VHS Coffeeman
+
+This module holds the RP2040 single-cycle IO (SIO) register addresses and the small
+viper helpers that read and write them. Every module that drives GPIOs by mask
+imports them from here instead of defining its own copies.
+
+Functions:
+    gpio_in: Read every GPIO input level at once
+    gpio_out: Read every GPIO output level at once
+    gpio_set: Drive every GPIO in a mask high
+    gpio_clr: Drive every GPIO in a mask low
+    init_outputs: Configure pins as SIO outputs driven high
+
+Usage:
+    from sio import gpio_set, gpio_clr, init_outputs
+    
+    # Configure pins 6 and 7 as outputs, initially high
+    mask = (1 << 6) | (1 << 7)
+    init_outputs((6, 7), mask)
+    
+    # Drive both pins low, then high again
+    gpio_clr(mask)
+    gpio_set(mask)
+
+The SET and CLR registers act only on the bits written as 1, so a single store
+changes any group of pins atomically without a read-modify-write. The helpers are
+compiled with viper, so each is one store or load through ptr32 and is safe to
+call from a hard interrupt handler.
+
+This module has no dependencies beyond MicroPython's rp2040 port.
+"""
+
+import micropython
+from machine import mem32
+from micropython import const
+
+# RP2040 SIO GPIO registers (one bit per GPIO; SET/CLR are single-store atomics)
+_SIO_GPIO_IN = const(0xd0000004)
+_SIO_GPIO_OUT = const(0xd0000010)
+_SIO_GPIO_OUT_SET = const(0xd0000014)
+_SIO_GPIO_OUT_CLR = const(0xd0000018)
+_SIO_GPIO_OE_SET = const(0xd0000024)
+
+# IO_BANK0 GPIOn_CTRL registers (8 bytes apart); FUNCSEL 5 routes the pin to SIO
+_IO_BANK0_GPIO_CTRL = const(0x40014004)
+_FUNCSEL_SIO = const(5)
+
+@micropython.viper
+def gpio_in() -> int:
+    # Read every GPIO input level at once (GPIO_IN)
+    return ptr32(_SIO_GPIO_IN)[0]
+
+@micropython.viper
+def gpio_out() -> int:
+    # Read every GPIO output level at once (GPIO_OUT)
+    return ptr32(_SIO_GPIO_OUT)[0]
+
+@micropython.viper
+def gpio_set(mask: int):
+    # Drive every GPIO in mask high (GPIO_OUT_SET)
+    ptr32(_SIO_GPIO_OUT_SET)[0] = mask
+
+@micropython.viper
+def gpio_clr(mask: int):
+    # Drive every GPIO in mask low (GPIO_OUT_CLR)
+    ptr32(_SIO_GPIO_OUT_CLR)[0] = mask
+
+def init_outputs(pin_nums, mask):
+    """
+    Configure pins as SIO outputs driven high, with masked register writes.
+    
+    Each pin still needs its own FUNCSEL write, but the output level and
+    direction are set for every pin at once. The pins are driven high before
+    the outputs are enabled so an active-low output is never asserted, even briefly.
+    
+    Args:
+        pin_nums: The GPIO numbers to configure.
+        mask: The combined bit mask of pin_nums.
+    """
+    for pin_num in pin_nums:
+        mem32[_IO_BANK0_GPIO_CTRL + 8 * pin_num] = _FUNCSEL_SIO
+    mem32[_SIO_GPIO_OUT_SET] = mask
+    mem32[_SIO_GPIO_OE_SET] = mask
@@ -21,6 +21,9 @@ States:
     - MAINTENANCE: System is performing maintenance operations
     - ERROR: An error has occurred and the system is in a recovery state
 
+States are small integers from config.states, so checking or looking up the current state
+is an integer operation; their names are only looked up for logging.
+
 Usage:
     from state_machine import StateMachine
     from pump_controller import PumpController
@@ -44,7 +47,7 @@ Usage:
     )
 
     # Enable debug mode for detailed logging
-    state_machine.debug = True
+    state_machine.set_debug(True)
 
     # Process a command
     command = serial.check_for_command()
@@ -52,11 +55,18 @@ Usage:
         state_machine.handle_command(command)
 
 The state machine ensures that commands are only processed when in the appropriate state.
-For example, START_POUR is only valid when in the RECIPE_LOADED state.
+For example, START_POUR is only valid when in the RECIPE_LOADED state. Each state has a
+table mapping the commands it accepts to their handlers, built once when the state machine
+is created; any other command is rejected.
 
 Error handling is included to detect and recover from error conditions, with appropriate
 state transitions and status messages.
 
+Pours and maintenance commands run as asyncio tasks, so the serial task keeps reading
+commands while the pumps are moving. The pump controller's motion lock serializes the
+moves themselves, and STOP cancels the outstanding tasks, which disables the pumps and
+feed-holds GRBL mid-move.
+
 This module depends on:
     - config.py for state definitions
     - pump_controller.py for dispensing operations
@@ -66,13 +76,43 @@ This module depends on:
     - maintenance.py for maintenance operations
 """
 
-import time
+import asyncio
+from micropython import const
 from config import states, commands
 from recipe import Recipe
+from grbl_interface import GRBLError
+
+# Number of recent states kept for debugging
+_HISTORY_LEN = const(10)
+
+def _state_name(state):
+    """
+    Get the printable name of a state.
+
+    Args:
+        state: The state value from config.states.
+
+    Returns:
+        str: The state's name, or the raw value if it is not a known state.
+    """
+    if 0 <= state < len(states.NAMES):
+        return states.NAMES[state]
+    return str(state)
+
+def _no_debug_log(*parts):
+    """Stand-in for StateMachine.debug_log while debug logging is disabled."""
+    pass
 
 class StateMachine:
     """Manages the system's state and processes commands."""
 
+    # State -> (status, message) sent to the Pi on entering that state
+    _STATUS_MAP = {
+        states.READY: (commands.READY, None),
+        states.POURING: (commands.POURING, None),
+        states.ERROR: (commands.ERROR, "System in error state"),
+    }
+
     def __init__(self, pump_controller, vcr_controller, serial, maintenance, debug=False):
         """
         Initialize the state machine with all required components.
@@ -90,8 +130,8 @@ class StateMachine:
         self.serial = serial
         self.maintenance = maintenance
 
-        # Debug flag for detailed logging
-        self.debug = debug
+        # Debug flag for detailed logging; also selects what debug_log does
+        self.set_debug(debug)
 
         # Initialize state
         self.state = states.INITIALIZING
@@ -99,75 +139,101 @@ class StateMachine:
         # Initialize recipe
         self.current_recipe = None
 
-        # Track state history for debugging
-        self.state_history = [states.INITIALIZING]
+        # Pour and maintenance tasks still running in the background
+        self._motion_tasks = []
+
+        # State -> {command type -> handler}; a command missing from its
+        # state's table is not allowed in that state
+        self._state_dispatch = {
+            states.READY: {
+                commands.RECIPE: self._load_recipe,
+                commands.MAINTENANCE: self._enter_maintenance,
+            },
+            states.RECIPE_LOADED: {
+                commands.START_POUR: self._start_pour,
+                commands.STOP: self._abandon_recipe,
+                commands.RECIPE: self._update_recipe,
+            },
+            states.POURING: {
+                commands.STOP: self._stop_pour,
+            },
+            states.MAINTENANCE: {
+                commands.MAINTENANCE: self._queue_maintenance,
+                commands.STOP: self._stop_maintenance,
+            },
+            states.ERROR: {
+                commands.STOP: self._reset_from_error,
+            },
+        }
+
+        # Track state history for debugging in a fixed ring, overwriting the
+        # oldest entry, so a transition never shifts or grows a list
+        self._history = [None] * _HISTORY_LEN
+        self._history[0] = states.INITIALIZING
+        self._history_next = 1
 
         # Set system to READY state after initialization
-        self.transition_to(states.READY)
+        self._enter(states.READY)
 
-        if self.debug:
-            self.debug_log("State machine initialized with debug logging enabled")
+        self.debug_log("State machine initialized with debug logging enabled")
 
-    def debug_log(self, message):
+    def set_debug(self, enabled):
         """
-        Log a debug message if debug mode is enabled.
+        Enable or disable detailed debug logging.
+
+        debug_log is rebound to a function that does nothing while logging is
+        disabled, so debug_log calls with a fixed message need no guard.
+        Calls whose arguments have to be computed are still made under
+        `if self.debug:`, so they cost nothing when logging is off.
 
         Args:
-            message: The message to log.
+            enabled: True to print debug messages.
         """
-        if self.debug:
-            print(f"[STATE MACHINE DEBUG] {message}")
+        self.debug = enabled
+        self.debug_log = self._print_debug if enabled else _no_debug_log
 
-    def transition_to(self, new_state):
+    def _print_debug(self, *parts):
         """
-        Transition to a new state and report the change.
+        Print a debug message; debug_log points here while debug mode is enabled.
+
+        The parts are printed separated by spaces, as print() does, so callers
+        pass values alongside the text instead of formatting a string first.
 
         Args:
-            new_state: The new state to transition to.
+            parts: The text and values making up the message.
+        """
+        print("[STATE MACHINE DEBUG]", *parts)
 
-        Returns:
-            bool: True if the transition was successful, False otherwise.
+    def _enter(self, new_state):
         """
-        try:
-            old_state = self.state
-            self.state = new_state
+        Enter a new state: record it, log the change once and send its status to the Pi.
 
-            # Add to state history
-            self.state_history.append(new_state)
-            if len(self.state_history) > 10:
-                self.state_history.pop(0)  # Keep history manageable
+        Every state change goes through here, so callers need not log it themselves.
+        It has no exception handler of its own: a failure inside handle_command is
+        caught there and puts the system in the ERROR state.
 
-            # Standard logging
-            print(f"State transition: {old_state} -> {new_state}")
+        Args:
+            new_state: The new state to transition to.
+        """
+        old_state = self.state
+        self.state = new_state
 
-            # Detailed debug logging
-            if self.debug:
-                self.debug_log(f"STATE TRANSITION: {old_state} -> {new_state}")
-                self.debug_log(f"State history: {' -> '.join(self.state_history)}")
-
-            # Send status update based on new state
-            if new_state == states.READY:
-                self.debug_log("Sending READY status to Pi")
-                self.serial.send_status(commands.READY)
-            elif new_state == states.POURING:
-                self.debug_log("Sending POURING status to Pi")
-                self.serial.send_status(commands.POURING)
-            elif new_state == states.ERROR:
-                self.debug_log("Sending ERROR status to Pi")
-                self.serial.send_status(commands.ERROR, "System in error state")
+        # Add to state history, replacing the oldest entry once it is full
+        pos = self._history_next
+        self._history[pos] = new_state
+        self._history_next = (pos + 1) % _HISTORY_LEN
 
-            return True
+        # Standard logging
+        print(f"State transition: {_state_name(old_state)} -> {_state_name(new_state)}")
 
-        except Exception as e:
-            print(f"Error transitioning to state {new_state}: {e}")
-            if self.debug:
-                self.debug_log(f"TRANSITION ERROR: Failed to transition from {old_state} to {new_state}")
-                self.debug_log(f"Error details: {str(e)}")
+        # Detailed debug logging
+        if self.debug:
+            self.debug_log("State history:", ' -> '.join(self.state_history()))
 
-            # Make sure we're in an error state if there was a problem
-            self.state = states.ERROR
-            self.serial.send_status(commands.ERROR, str(e))
-            return False
+        # Send status update based on new state
+        status = self._STATUS_MAP.get(new_state)
+        if status:
+            self.serial.send_status(status[0], status[1])
 
     def handle_command(self, command):
         """
@@ -179,342 +245,440 @@ class StateMachine:
         Returns:
             bool: True if the command was handled successfully, False otherwise.
         """
+        log = self.debug_log
+        debug = self.debug
+
         try:
-            command_type = command.get('type')
+            # Read the fields the handlers need once, up front
+            cmd_get = command.get
+            command_type = cmd_get('type')
+            action = cmd_get('action')
+            state = self.state
 
             # Standard logging
-            print(f"Handling command in state {self.state}: {command}")
+            print(f"Handling command in state {_state_name(state)}: {command}")
 
             # Debug logging
-            if self.debug:
-                self.debug_log(f"COMMAND RECEIVED: {command_type} in state {self.state}")
-                self.debug_log(f"Full command: {command}")
-
-            # Process command based on current state
-            if self.state == states.READY:
-                if self.debug:
-                    self.debug_log(f"Processing {command_type} command in READY state")
-                return self.handle_command_in_ready_state(command, command_type)
-
-            elif self.state == states.RECIPE_LOADED:
-                if self.debug:
-                    self.debug_log(f"Processing {command_type} command in RECIPE_LOADED state")
-                return self.handle_command_in_recipe_loaded_state(command, command_type)
-
-            elif self.state == states.POURING:
-                if self.debug:
-                    self.debug_log(f"Processing {command_type} command in POURING state")
-                return self.handle_command_in_pouring_state(command, command_type)
-
-            elif self.state == states.MAINTENANCE:
-                if self.debug:
-                    self.debug_log(f"Processing {command_type} command in MAINTENANCE state")
-                return self.handle_command_in_maintenance_state(command, command_type)
-
-            elif self.state == states.ERROR:
-                # In error state, only accept reset commands
-                if self.debug:
-                    self.debug_log(f"Processing {command_type} command in ERROR state")
-
-                if command_type == commands.STOP:
-                    self.debug_log("STOP command received in ERROR state - attempting system reset")
-                    return self.reset_system()
-                else:
-                    if self.debug:
-                        self.debug_log(f"Command {command_type} not allowed in ERROR state")
-                    print(f"Command {command_type} not allowed in ERROR state")
-                    self.serial.send_status(commands.ERROR, "System in error state, use STOP to reset")
-                    return False
-
-            else:
-                if self.debug:
-                    self.debug_log(f"INVALID STATE: {self.state}")
-                print(f"Unknown state: {self.state}")
-                self.transition_to(states.ERROR)
+            if debug:
+                log("COMMAND RECEIVED:", command_type, "in state", _state_name(state))
+                log("Full command:", command)
+
+            # Look up the state's command table, then the handler for this command
+            handlers = self._state_dispatch.get(state)
+            if handlers is None:
+                if debug:
+                    log("INVALID STATE:", _state_name(state))
+                print(f"Unknown state: {_state_name(state)}")
+                self._enter(states.ERROR)
                 return False
 
+            if debug:
+                log("Processing", command_type, "command in", _state_name(state), "state")
+
+            handler = handlers.get(command_type)
+            if handler:
+                return handler(command, action)
+            return self._reject(command_type)
+
+        except GRBLError:
+            # GRBL has stopped answering; main resets it and carries on
+            raise
+
         except Exception as e:
             print(f"Error handling command: {e}")
-            if self.debug:
-                self.debug_log(f"COMMAND HANDLING ERROR: {str(e)}")
-            self.transition_to(states.ERROR)
+            if debug:
+                log("COMMAND HANDLING ERROR:", e)
+            self._enter(states.ERROR)
             self.serial.send_status(commands.ERROR, str(e))
             return False
 
-    def handle_command_in_ready_state(self, command, command_type):
+    def _load_recipe(self, command, action):
         """
-        Handle commands in the READY state.
+        Load the recipe from a RECIPE command received in the READY state.
 
         Args:
             command: The full command object.
-            command_type: The type of command.
+            action: The command's 'action' field, or None if it has none.
 
         Returns:
-            bool: True if the command was handled successfully, False otherwise.
+            bool: True if the recipe was loaded, False otherwise.
         """
-        if command_type == commands.RECIPE:
-            if self.debug:
-                self.debug_log("Received RECIPE command in READY state")
+        log = self.debug_log
 
-            # Create a recipe from the command
-            if self.debug:
-                self.debug_log("Creating recipe from command")
-            recipe = Recipe.from_command(command)
-
-            if recipe:
-                if self.debug:
-                    self.debug_log(f"Valid recipe created with ID: {recipe.id}")
-                    self.debug_log(f"Recipe contains {len(recipe.ingredients)} ingredients")
-
-                self.current_recipe = recipe
-                self.transition_to(states.RECIPE_LOADED)
-                return True
-            else:
-                if self.debug:
-                    self.debug_log("Failed to create valid recipe from command")
-                self.serial.send_status(commands.ERROR, "Invalid recipe")
-                return False
+        log("Received RECIPE command in READY state")
 
-        elif command_type == commands.MAINTENANCE:
+        # Create a recipe from the command
+        log("Creating recipe from command")
+        recipe = Recipe.from_command(command, self.pump_controller)
+
+        if recipe:
             if self.debug:
-                self.debug_log("Received MAINTENANCE command in READY state")
-                self.debug_log("Transitioning to MAINTENANCE state")
+                log("Valid recipe created with ID:", recipe.id)
+                log("Recipe contains", recipe.ingredient_count(), "ingredients")
 
-            # Transition to maintenance state
-            self.transition_to(states.MAINTENANCE)
+            self.current_recipe = recipe
+            self._enter(states.RECIPE_LOADED)
+            return True
+        else:
+            log("Failed to create valid recipe from command")
+            self.serial.send_status(commands.ERROR, "Invalid recipe")
+            return False
 
-            # Execute the maintenance command
-            if self.debug:
-                action = command.get('action', 'unknown')
-                self.debug_log(f"Executing maintenance action: {action}")
+    def _enter_maintenance(self, command, action):
+        """
+        Start a MAINTENANCE command received in the READY state.
 
-            success = self.maintenance.execute_command(command)
+        Args:
+            command: The full command object.
+            action: The command's 'action' field, or None if it has none.
 
-            if self.debug:
-                result = "successful" if success else "failed"
-                self.debug_log(f"Maintenance execution {result}")
-                self.debug_log("Transitioning back to READY state")
+        Returns:
+            bool: Always True; the command runs in the background.
+        """
+        log = self.debug_log
 
-            # Transition back to ready state
-            self.transition_to(states.READY)
-            return success
+        log("Received MAINTENANCE command in READY state")
 
-        else:
-            if self.debug:
-                self.debug_log(f"Command {command_type} not allowed in READY state")
-            print(f"Command {command_type} not allowed in READY state")
-            return False
+        # Transition to maintenance state
+        self._enter(states.MAINTENANCE)
 
-    def handle_command_in_recipe_loaded_state(self, command, command_type):
+        # Run the maintenance command in the background; it returns to READY when done
+        if self.debug:
+            log("Executing maintenance action:", action or 'unknown')
+
+        self._start_maintenance(command)
+        return True
+
+    def _start_pour(self, command, action):
         """
-        Handle commands in the RECIPE_LOADED state.
+        Start pouring the loaded recipe on START_POUR.
 
         Args:
             command: The full command object.
-            command_type: The type of command.
+            action: The command's 'action' field, or None if it has none.
 
         Returns:
-            bool: True if the command was handled successfully, False otherwise.
+            bool: Always True; the pour runs in the background.
         """
-        if command_type == commands.START_POUR:
-            if self.debug:
-                self.debug_log("Received START_POUR command in RECIPE_LOADED state")
-                self.debug_log("Beginning drink dispensing sequence")
+        log = self.debug_log
 
-            # Transition to pouring state
-            self.transition_to(states.POURING)
+        log("Received START_POUR command in RECIPE_LOADED state")
+        log("Beginning drink dispensing sequence")
 
-            # Trigger VCR play
-            if self.debug:
-                self.debug_log("Triggering VCR play button")
-            self.vcr_controller.play()
+        # Transition to pouring state
+        self._enter(states.POURING)
 
-            # Wait a moment for the VCR to start playing
-            if self.debug:
-                self.debug_log("Waiting for VCR to start playing (1 second delay)")
-            time.sleep(1)
+        # Trigger VCR play
+        log("Triggering VCR play button")
+        self.vcr_controller.play()
 
-            # Execute the recipe
-            if self.debug:
-                self.debug_log("Executing recipe (dispensing ingredients)")
-            success = self.current_recipe.execute(self.pump_controller)
-
-            # Handle completion
-            if success:
-                if self.debug:
-                    self.debug_log("Recipe execution completed successfully")
-                    self.debug_log("Sending COMPLETE status to Pi")
-                self.serial.send_status(commands.COMPLETE)
-
-                # Trigger VCR eject
-                if self.debug:
-                    self.debug_log("Triggering VCR eject button")
-                self.vcr_controller.eject()
-            else:
-                if self.debug:
-                    self.debug_log("Recipe execution failed")
-                self.serial.send_status(commands.ERROR, "Failed to execute recipe")
-                self.transition_to(states.ERROR)
-                return False
+        # Pour in the background so STOP can still be received
+        self._motion_tasks.append(asyncio.create_task(self._run_pour(self.current_recipe)))
+        return True
 
-            # Reset the system
-            if self.debug:
-                self.debug_log("Clearing current recipe")
-                self.debug_log("Transitioning back to READY state")
-            self.current_recipe = None
-            self.transition_to(states.READY)
-            return True
+    def _abandon_recipe(self, command, action):
+        """
+        Drop the loaded recipe on STOP and return to READY.
 
-        elif command_type == commands.STOP:
-            if self.debug:
-                self.debug_log("Received STOP command in RECIPE_LOADED state")
-                self.debug_log("Abandoning loaded recipe")
+        Args:
+            command: The full command object.
+            action: The command's 'action' field, or None if it has none.
 
-            # Reset the system
-            self.current_recipe = None
-            self.transition_to(states.READY)
-            return True
+        Returns:
+            bool: Always True.
+        """
+        log = self.debug_log
 
-        elif command_type == commands.RECIPE:
-            if self.debug:
-                self.debug_log("Received RECIPE command in RECIPE_LOADED state")
-                self.debug_log("Updating currently loaded recipe")
-
-            # Update the recipe
-            recipe = Recipe.from_command(command)
-            if recipe:
-                if self.debug:
-                    self.debug_log(f"Valid recipe update with ID: {recipe.id}")
-                    self.debug_log(f"Updated recipe contains {len(recipe.ingredients)} ingredients")
-                self.current_recipe = recipe
-                return True
-            else:
-                if self.debug:
-                    self.debug_log("Failed to create valid recipe from update command")
-                self.serial.send_status(commands.ERROR, "Invalid recipe")
-                return False
+        log("Received STOP command in RECIPE_LOADED state")
+        log("Abandoning loaded recipe")
 
-        else:
-            if self.debug:
-                self.debug_log(f"Command {command_type} not allowed in RECIPE_LOADED state")
-            print(f"Command {command_type} not allowed in RECIPE_LOADED state")
-            return False
+        # Reset the system
+        self.current_recipe = None
+        self._enter(states.READY)
+        return True
 
-    def handle_command_in_pouring_state(self, command, command_type):
+    def _update_recipe(self, command, action):
         """
-        Handle commands in the POURING state.
+        Replace the loaded recipe with the one from a new RECIPE command.
 
         Args:
             command: The full command object.
-            command_type: The type of command.
+            action: The command's 'action' field, or None if it has none.
 
         Returns:
-            bool: True if the command was handled successfully, False otherwise.
+            bool: True if the recipe was replaced, False otherwise.
         """
-        if command_type == commands.STOP:
-            if self.debug:
-                self.debug_log("Received STOP command in POURING state")
-                self.debug_log("Stopping all pumps immediately")
+        log = self.debug_log
 
-            # Stop all pumps
-            self.pump_controller.disable_all()
+        log("Received RECIPE command in RECIPE_LOADED state")
+        log("Updating currently loaded recipe")
 
-            # Reset the system
+        # Update the recipe
+        recipe = Recipe.from_command(command, self.pump_controller)
+        if recipe:
             if self.debug:
-                self.debug_log("Clearing current recipe")
-                self.debug_log("Transitioning back to READY state")
-            self.current_recipe = None
-            self.transition_to(states.READY)
+                log("Valid recipe update with ID:", recipe.id)
+                log("Updated recipe contains", recipe.ingredient_count(), "ingredients")
+            self.current_recipe = recipe
             return True
-
         else:
-            if self.debug:
-                self.debug_log(f"Command {command_type} not allowed in POURING state")
-            print(f"Command {command_type} not allowed in POURING state")
+            log("Failed to create valid recipe from update command")
+            self.serial.send_status(commands.ERROR, "Invalid recipe")
             return False
 
-    def handle_command_in_maintenance_state(self, command, command_type):
+    def _stop_pour(self, command, action):
+        """
+        Cancel the running pour on STOP and return to READY.
+
+        Args:
+            command: The full command object.
+            action: The command's 'action' field, or None if it has none.
+
+        Returns:
+            bool: Always True.
+        """
+        log = self.debug_log
+
+        log("Received STOP command in POURING state")
+        log("Stopping all pumps immediately")
+
+        # Cancel the pour and stop all pumps
+        self._cancel_motion()
+        self.pump_controller.stop()
+
+        # Reset the system
+        log("Clearing current recipe")
+        self.current_recipe = None
+        self._enter(states.READY)
+        return True
+
+    def _queue_maintenance(self, command, action):
         """
-        Handle commands in the MAINTENANCE state.
+        Queue a MAINTENANCE command received while maintenance is running.
 
         Args:
             command: The full command object.
+            action: The command's 'action' field, or None if it has none.
+
+        Returns:
+            bool: Always True; the command runs in the background.
+        """
+        if self.debug:
+            self.debug_log("Received MAINTENANCE command in MAINTENANCE state:", action or 'unknown')
+
+        # Queue the maintenance command; the motion lock runs it after the current one
+        self._start_maintenance(command)
+        return True
+
+    def _stop_maintenance(self, command, action):
+        """
+        Cancel running maintenance on STOP and return to READY.
+
+        Args:
+            command: The full command object.
+            action: The command's 'action' field, or None if it has none.
+
+        Returns:
+            bool: Always True.
+        """
+        log = self.debug_log
+
+        log("Received STOP command in MAINTENANCE state")
+        log("Stopping all pumps")
+
+        # Cancel running maintenance and stop all pumps
+        self._cancel_motion()
+        self.pump_controller.stop()
+
+        # Transition to ready state
+        self._enter(states.READY)
+        return True
+
+    def _reset_from_error(self, command, action):
+        """
+        Reset the system on STOP, the only command accepted in the ERROR state.
+
+        Args:
+            command: The full command object.
+            action: The command's 'action' field, or None if it has none.
+
+        Returns:
+            bool: True if the system was reset successfully, False otherwise.
+        """
+        self.debug_log("STOP command received in ERROR state - attempting system reset")
+        return self.reset_system()
+
+    def _reject(self, command_type):
+        """
+        Report a command that is not allowed in the current state.
+
+        Args:
             command_type: The type of command.
 
         Returns:
-            bool: True if the command was handled successfully, False otherwise.
+            bool: Always False.
         """
-        if command_type == commands.MAINTENANCE:
-            if self.debug:
-                action = command.get('action', 'unknown')
-                self.debug_log(f"Received MAINTENANCE command in MAINTENANCE state: {action}")
+        name = _state_name(self.state)
+        if self.debug:
+            self.debug_log("Command", command_type, "not allowed in", name, "state")
+        print(f"Command {command_type} not allowed in {name} state")
 
-            # Execute the maintenance command
-            success = self.maintenance.execute_command(command)
+        # In the ERROR state, remind the Pi how to recover
+        if self.state == states.ERROR:
+            self.serial.send_status(commands.ERROR, "System in error state, use STOP to reset")
+        return False
 
-            if self.debug:
-                result = "successful" if success else "failed"
-                self.debug_log(f"Maintenance execution {result}")
+    def _cancel_motion(self):
+        """Cancel every pour and maintenance task still running."""
+        for task in self._motion_tasks[:]:
+            task.cancel()
 
-            return success
+    async def _recover_from_grbl_error(self, error):
+        """
+        Reset GRBL after a communication error inside a motion task.
 
-        elif command_type == commands.STOP:
-            if self.debug:
-                self.debug_log("Received STOP command in MAINTENANCE state")
-                self.debug_log("Stopping all pumps")
+        Motion tasks run outside main's recovery, so they report the error and
+        soft-reset GRBL themselves; the pumps are already disabled.
 
-            # Stop all pumps
-            self.pump_controller.disable_all()
+        Args:
+            error: The GRBLError that was raised.
+        """
+        print(f"GRBL error: {error}")
+        await self.pump_controller.grbl.soft_reset()
+        self.serial.send_status(commands.ERROR, str(error))
 
-            # Transition to ready state
-            if self.debug:
-                self.debug_log("Transitioning back to READY state")
-            self.transition_to(states.READY)
-            return True
+    async def _run_pour(self, recipe):
+        """
+        Pour a recipe, then eject the tape and return to READY.
+
+        Args:
+            recipe: The Recipe to execute.
+        """
+        log = self.debug_log
+
+        try:
+            # Wait a moment for the VCR to start playing
+            log("Waiting for VCR to start playing (1 second delay)")
+            await asyncio.sleep(1)
+
+            # Execute the recipe
+            log("Executing recipe (dispensing ingredients)")
+            success = await recipe.execute(self.pump_controller)
 
+        except asyncio.CancelledError:
+            # STOP has already stopped the pumps and changed state
+            log("Pour cancelled")
+            return
+
+        except GRBLError as e:
+            await self._recover_from_grbl_error(e)
+            self.current_recipe = None
+            self._enter(states.READY)
+            return
+
+        finally:
+            self._motion_tasks.remove(asyncio.current_task())
+
+        # Handle completion
+        if success:
+            log("Recipe execution completed successfully")
+            log("Sending COMPLETE status to Pi")
+            self.serial.send_status(commands.COMPLETE)
+
+            # Trigger VCR eject
+            log("Triggering VCR eject button")
+            self.vcr_controller.eject()
         else:
+            log("Recipe execution failed")
+            self.serial.send_status(commands.ERROR, "Failed to execute recipe")
+            self._enter(states.ERROR)
+            return
+
+        # Reset the system
+        log("Clearing current recipe")
+        self.current_recipe = None
+        self._enter(states.READY)
+
+    def _start_maintenance(self, command):
+        """
+        Start a maintenance command as a background task.
+
+        Args:
+            command: The full command object.
+        """
+        self._motion_tasks.append(asyncio.create_task(self._run_maintenance(command)))
+
+    async def _run_maintenance(self, command):
+        """
+        Run a maintenance command and return to READY once no other maintenance is pending.
+
+        Args:
+            command: The full command object.
+        """
+        log = self.debug_log
+
+        try:
+            success = await self.maintenance.execute_command(command)
+
             if self.debug:
-                self.debug_log(f"Command {command_type} not allowed in MAINTENANCE state")
-            print(f"Command {command_type} not allowed in MAINTENANCE state")
-            return False
+                result = "successful" if success else "failed"
+                log("Maintenance execution", result)
+
+        except asyncio.CancelledError:
+            # STOP has already stopped the pumps and changed state
+            log("Maintenance cancelled")
+            return
+
+        except GRBLError as e:
+            await self._recover_from_grbl_error(e)
+
+        finally:
+            self._motion_tasks.remove(asyncio.current_task())
+
+        # Transition back to ready state after the last queued command
+        if not self._motion_tasks and self.state == states.MAINTENANCE:
+            self._enter(states.READY)
 
     def reset_system(self):
         """
         Reset the system to a known good state.
 
+        Errors are left to the caller: handle_command's handler when the Pi sends
+        STOP, or main's loop after a GRBL failure.
+
         Returns:
-            bool: True if the system was reset successfully, False otherwise.
+            bool: True once the system has been reset.
         """
-        try:
-            print("Resetting system")
-            if self.debug:
-                self.debug_log("SYSTEM RESET initiated")
+        log = self.debug_log
 
-            # Stop all pumps
-            if self.debug:
-                self.debug_log("Disabling all pumps")
-            self.pump_controller.disable_all()
+        print("Resetting system")
+        log("SYSTEM RESET initiated")
 
-            # Clear current recipe
-            if self.debug:
-                self.debug_log("Clearing current recipe")
-            self.current_recipe = None
+        # Cancel any motion and stop all pumps
+        log("Disabling all pumps")
+        self._cancel_motion()
+        self.pump_controller.disable_all()
 
-            # Transition to ready state
-            if self.debug:
-                self.debug_log("Transitioning to READY state")
-            self.transition_to(states.READY)
+        # Clear current recipe
+        log("Clearing current recipe")
+        self.current_recipe = None
 
-            if self.debug:
-                self.debug_log("System reset completed successfully")
-            return True
+        # Transition to ready state
+        self._enter(states.READY)
 
-        except Exception as e:
-            print(f"Error resetting system: {e}")
-            if self.debug:
-                self.debug_log(f"SYSTEM RESET ERROR: {str(e)}")
-            self.serial.send_status(commands.ERROR, str(e))
-            return False
+        log("System reset completed successfully")
+        return True
+
+    def state_history(self):
+        """
+        Get the most recent states, oldest first.
+
+        Returns:
+            list: The names of up to the last 10 states entered.
+        """
+        pos = self._history_next
+        history = self._history[pos:] + self._history[:pos]
+        return [_state_name(state) for state in history if state is not None]
 
     def dump_state(self):
         """
@@ -523,14 +687,14 @@ class StateMachine:
         Returns:
             str: A string representation of the current state.
         """
-        info = [
-            f"Current State: {self.state}",
-            f"State History: {' -> '.join(self.state_history)}",
-            f"Current Recipe: {'Set' if self.current_recipe else 'None'}",
-        ]
+        recipe = self.current_recipe
+
+        # Format the whole report in one call, rather than a list of lines
+        # that are each formatted and then joined
+        text = "Current State: {}\nState History: {}\nCurrent Recipe: {}".format(
+            _state_name(self.state), ' -> '.join(self.state_history()), 'Set' if recipe else 'None')
 
-        if self.current_recipe:
-            info.append(f"  Recipe ID: {self.current_recipe.id}")
-            info.append(f"  Ingredients: {len(self.current_recipe.ingredients)}")
+        if recipe:
+            text += "\n  Recipe ID: {}\n  Ingredients: {}".format(recipe.id, recipe.ingredient_count())
 
-        return "\n".join(info)
\ No newline at end of file
+        return text
\ No newline at end of file
@@ -15,7 +15,6 @@ The VCRController class is responsible for:
 
 Usage:
     from vcr_controller import VCRController
-    from config import pins
     
     # Initialize the controller
     vcr = VCRController()
@@ -30,7 +29,8 @@ The controller uses the pin definitions in config.py for the play and eject butt
 The button presses are implemented as momentary pulses with appropriate timing to
 simulate a physical button press.
 
-Error handling is included to detect and report any issues with the button pins.
+Driving a GPIO output cannot fail in normal operation, so a press runs straight through
+without its own exception handler; callers such as the state machine handle any error.
 
 This module depends on:
     - config.py for pin definitions
@@ -38,7 +38,7 @@ This module depends on:
 
 import time
 from machine import Pin
-from config import pins, constants
+from config import VCR_PLAY, VCR_EJECT, BUTTON_PRESS_MS
 
 class VCRController:
     """Controls the VCR's play and eject buttons."""
@@ -46,12 +46,15 @@ class VCRController:
     def __init__(self):
         """Initialize the VCR controller with pin setup."""
         # Initialize the play and eject button pins as outputs
-        self.play_pin = Pin(pins.VCR_PLAY, Pin.OUT)
-        self.eject_pin = Pin(pins.VCR_EJECT, Pin.OUT)
+        self.play_pin = Pin(VCR_PLAY, Pin.OUT)
+        self.eject_pin = Pin(VCR_EJECT, Pin.OUT)
         
         # Set pins to initial state (inactive)
         self.play_pin.value(0)
         self.eject_pin.value(0)
+        
+        # How long each press holds the button down
+        self._press_ms = BUTTON_PRESS_MS
     
     def press_button(self, button_pin, description="button"):
         """
@@ -62,39 +65,27 @@ class VCRController:
             description: A description of the button for logging.
             
         Returns:
-            bool: True if the button press was executed, False otherwise.
+            bool: True once the button press has been executed.
         """
-        try:
-            print(f"Pressing {description} button")
-            
-            # Set the pin high (active)
-            button_pin.value(1)
-            
-            # Wait for the button press duration
-            time.sleep_ms(constants.BUTTON_PRESS_MS)
-            
-            # Set the pin low (inactive)
-            button_pin.value(0)
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error pressing {description} button: {e}")
-            
-            # Make sure the pin is set low (inactive) in case of error
-            try:
-                button_pin.value(0)
-            except:
-                pass
-                
-            return False
+        print(f"Pressing {description} button")
+        
+        # Set the pin high (active)
+        button_pin.value(1)
+        
+        # Wait for the button press duration
+        time.sleep_ms(self._press_ms)
+        
+        # Set the pin low (inactive)
+        button_pin.value(0)
+        
+        return True
     
     def play(self):
         """
         Trigger the play button.
         
         Returns:
-            bool: True if the play button was pressed successfully, False otherwise.
+            bool: True once the play button has been pressed.
         """
         return self.press_button(self.play_pin, "play")
     
@@ -103,6 +94,6 @@ class VCRController:
         Trigger the eject button.
         
         Returns:
-            bool: True if the eject button was pressed successfully, False otherwise.
+            bool: True once the eject button has been pressed.
         """
         return self.press_button(self.eject_pin, "eject")
\ No newline at end of file
@@ -18,13 +18,15 @@ Usage:
     
     # Test eject button
     tester.test_eject()
+
+VCRTester is a VCRController, so the tests press the buttons with the same code the
+main program uses; only the press duration differs.
 """
 
 import time
-from machine import Pin
-from config import pins, constants
+from vcr_controller import VCRController
 
-class VCRTester:
+class VCRTester(VCRController):
     """Provides basic testing functionality for the VCR controller."""
     
     def __init__(self, extended_press=False):
@@ -35,58 +37,15 @@ class VCRTester:
             extended_press: If True, use longer button press durations for better
                            visibility when testing with LEDs or multimeter.
         """
-        # Initialize the play and eject button pins as outputs
-        self.play_pin = Pin(pins.VCR_PLAY, Pin.OUT)
-        self.eject_pin = Pin(pins.VCR_EJECT, Pin.OUT)
-        
-        # Set pins to initial state (inactive)
-        self.play_pin.value(0)
-        self.eject_pin.value(0)
+        # Set up the button pins as the controller does
+        super().__init__()
         
-        # Set button press duration based on test mode
+        # Lengthen the press for testing visibility; otherwise keep the
+        # controller's duration from config
         if extended_press:
-            self.button_press_ms = 2000  # 2 seconds for testing visibility
-        else:
-            self.button_press_ms = constants.BUTTON_PRESS_MS  # Normal duration from config
+            self._press_ms = 2000  # 2 seconds
         
-        print(f"VCR Tester initialized (press duration: {self.button_press_ms}ms)")
-    
-    def press_button(self, button_pin, description="button"):
-        """
-        Press a button (momentary pulse).
-        
-        Args:
-            button_pin: The Pin object for the button.
-            description: A description of the button for logging.
-            
-        Returns:
-            bool: True if the button press was executed, False otherwise.
-        """
-        try:
-            print(f"Pressing {description} button")
-            
-            # Set the pin high (active)
-            button_pin.value(1)
-            
-            # Wait for the button press duration
-            time.sleep_ms(self.button_press_ms)
-            
-            # Set the pin low (inactive)
-            button_pin.value(0)
-            
-            print(f"{description} button press complete")
-            return True
-            
-        except Exception as e:
-            print(f"Error pressing {description} button: {e}")
-            
-            # Make sure the pin is set low (inactive) in case of error
-            try:
-                button_pin.value(0)
-            except:
-                pass
-                
-            return False
+        print(f"VCR Tester initialized (press duration: {self._press_ms}ms)")
     
     def test_play(self):
         """
@@ -96,7 +55,9 @@ class VCRTester:
             bool: True if the play button was pressed successfully, False otherwise.
         """
         print("\n--- Testing Play Button ---")
-        return self.press_button(self.play_pin, "play")
+        result = self.play()
+        print("play button press complete")
+        return result
     
     def test_eject(self):
         """
@@ -106,7 +67,9 @@ class VCRTester:
             bool: True if the eject button was pressed successfully, False otherwise.
         """
         print("\n--- Testing Eject Button ---")
-        return self.press_button(self.eject_pin, "eject")
+        result = self.eject()
+        print("eject button press complete")
+        return result
 
 
 # Simple test script when run directly